@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from batching import MicroBatcher
+
+
+class Model:
+    """predict_batch stand-in recording the patients of every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_batch(self, patients):
+        self.calls.append(list(patients))
+        if any('boom' in p for p in patients):
+            raise ValueError('boom')
+        return ['+'.join(p) for p in patients]
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+def test_flushes_when_batch_is_full():
+    model = Model()
+
+    async def main():
+        batcher = MicroBatcher(model.predict_batch, max_batch=4, max_wait=60)
+        return await asyncio.gather(batcher.predict([['a'], ['b']]), batcher.predict([['c'], ['d']]))
+
+    t = time.perf_counter()
+    assert run(main()) == [['a', 'b'], ['c', 'd']]
+    assert time.perf_counter() - t < 1
+    assert model.calls == [[['a'], ['b'], ['c'], ['d']]]
+
+
+def test_flushes_after_max_wait():
+    model = Model()
+
+    async def main():
+        batcher = MicroBatcher(model.predict_batch, max_batch=64, max_wait=0.05)
+        t = time.perf_counter()
+        results = await asyncio.gather(*(batcher.predict([[s]]) for s in 'abc'))
+        return results, time.perf_counter() - t
+
+    results, waited = run(main())
+    assert results == [['a'], ['b'], ['c']]
+    assert waited >= 0.05
+    assert model.calls == [[['a'], ['b'], ['c']]]
+
+
+def test_request_is_never_split():
+    model = Model()
+
+    async def main():
+        batcher = MicroBatcher(model.predict_batch, max_batch=2, max_wait=0)
+        return await asyncio.gather(batcher.predict([['a'], ['b'], ['c']]), batcher.predict([['d']]))
+
+    assert run(main()) == [['a', 'b', 'c'], ['d']]
+    assert model.calls == [[['a'], ['b'], ['c']], [['d']]]
+
+
+def test_error_reaches_every_waiter_in_the_batch():
+    model = Model()
+
+    async def main():
+        batcher = MicroBatcher(model.predict_batch, max_batch=64, max_wait=0.01)
+        return await asyncio.gather(batcher.predict([['boom']]), batcher.predict([['a']]),
+                                    return_exceptions=True)
+
+    results = run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(model.calls) == 1
+
+
+def test_empty_request_skips_the_model():
+    model = Model()
+    batcher = MicroBatcher(model.predict_batch)
+    assert run(batcher.predict([])) == []
+    assert model.calls == []
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+
+from feature_store import META_FILE, FeatureStore, FeatureStoreWriter
+
+COLUMNS = [f's{i}' for i in range(13)]  # not a multiple of 8, so rows carry padding bits
+
+
+def random_rows(rng, n):
+    return (rng.random((n, len(COLUMNS))) < 0.3).astype(np.float32)
+
+
+def test_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    X = random_rows(rng, 50)
+    y = rng.integers(0, 41, len(X))
+    with FeatureStoreWriter(tmp_path, COLUMNS, labels=True) as writer:
+        writer.append(X[:20] * 7, y[:20])  # any nonzero value is a present symptom
+        writer.append(X[20:], y[20:])
+
+    store = FeatureStore(tmp_path)
+    assert len(store) == 50
+    assert store.columns == COLUMNS
+    assert store.packed.shape == (50, 2)
+    assert isinstance(store.packed, np.memmap)
+    np.testing.assert_array_equal(store.to_dense(rows=16), X)
+    np.testing.assert_array_equal(store.unpack(5, 9, dtype=np.uint8), X[5:9])
+    np.testing.assert_array_equal(store.labels, y)
+
+    starts = []
+    for start, Xb, yb in store.batches(rows=16):
+        starts.append(start)
+        np.testing.assert_array_equal(Xb, X[start:start + 16])
+        np.testing.assert_array_equal(yb, y[start:start + 16])
+    assert starts == [0, 16, 32, 48]
+
+
+def test_empty_store(tmp_path):
+    FeatureStoreWriter(tmp_path, COLUMNS).close()
+    store = FeatureStore(tmp_path)
+    assert len(store) == 0
+    assert store.labels is None
+    assert store.to_dense().shape == (0, len(COLUMNS))
+
+
+def test_interrupted_build_cannot_be_opened(tmp_path):
+    with pytest.raises(RuntimeError):
+        with FeatureStoreWriter(tmp_path, COLUMNS) as writer:
+            writer.append(np.ones((3, len(COLUMNS))))
+            raise RuntimeError("interrupted")
+    assert not os.path.exists(tmp_path / META_FILE)
+    with pytest.raises(FileNotFoundError):
+        FeatureStore(tmp_path)
+
+
+def test_rejects_mismatched_rows(tmp_path):
+    with FeatureStoreWriter(tmp_path, COLUMNS, labels=True) as writer:
+        with pytest.raises(ValueError):
+            writer.append(np.ones((2, len(COLUMNS) + 1)), [0, 1])
+        with pytest.raises(ValueError):
+            writer.append(np.ones((2, len(COLUMNS))))
+        with pytest.raises(ValueError):
+            writer.append(np.ones((2, len(COLUMNS))), [0])
+        writer.append(np.ones((1, len(COLUMNS))), [3])
+    store = FeatureStore(tmp_path)
+    assert os.path.getsize(tmp_path / 'bits.u8') == store.packed.nbytes
+    np.testing.assert_array_equal(store.to_dense(), np.ones((1, len(COLUMNS))))
+    np.testing.assert_array_equal(store.labels, [3])
@@ -0,0 +1,41 @@
+from prediction_cache import PredictionCache
+
+
+def test_evicts_least_recently_used():
+    cache = PredictionCache(maxsize=2)
+    cache.put(0b01, 'Acne')
+    cache.put(0b10, 'Allergy')
+    assert cache.get(0b01) == 'Acne'  # now 0b10 is the oldest
+    cache.put(0b11, 'Malaria')
+    assert cache.get(0b10) is None
+    assert cache.get(0b01) == 'Acne'
+    assert cache.get(0b11) == 'Malaria'
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+
+def test_put_refreshes_existing_key():
+    cache = PredictionCache(maxsize=2)
+    cache.put(1, 'Acne')
+    cache.put(2, 'Allergy')
+    cache.put(1, 'Acne')
+    cache.put(3, 'Malaria')
+    assert cache.get(2) is None
+    assert cache.get(1) == 'Acne'
+
+
+def test_stale_generation_is_ignored():
+    cache = PredictionCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.put(1, 'Acne', generation)
+    assert cache.get(1) is None
+    cache.put(1, 'Acne', cache.generation)
+    assert cache.get(1) == 'Acne'
+
+
+def test_zero_size_disables_cache():
+    cache = PredictionCache(maxsize=0)
+    cache.put(1, 'Acne')
+    assert cache.get(1) is None
+    assert cache.stats()['misses'] == 1
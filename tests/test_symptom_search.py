@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import symptom_search
+from symptom_search import SEARCH_DEBOUNCE_MS, SymptomIndex, edit_distance
+
+KEYS = ['itching', 'skin_rash', 'diarrhoea', 'high_fever', 'mild_fever', 'stomach_pain', 'chest_pain']
+
+
+def test_prefix_and_substring():
+    index = SymptomIndex(KEYS)
+    assert index.search('stom') == {'stomach_pain'}
+    assert index.search('pain') == {'stomach_pain', 'chest_pain'}
+    assert index.search('ever') == {'high_fever', 'mild_fever'}
+    assert index.search('high fev') == {'high_fever'}
+
+
+def test_fuzzy_and_synonyms():
+    index = SymptomIndex(KEYS)
+    assert index.search('diarhea') == {'diarrhoea'}
+    assert index.search('feevr') == {'high_fever', 'mild_fever'}
+    assert index.search('itchy') == {'itching'}
+    assert index.search('xyzzy') == frozenset()
+
+
+def test_empty_query_shows_everything():
+    index = SymptomIndex(KEYS)
+    assert index.search('  ') is None
+    assert index.visible('') == set(KEYS)
+
+
+def test_edit_distance_gives_up_past_limit():
+    assert edit_distance('fever', 'fevre', 1) == 1
+    assert edit_distance('fever', 'rash', 2) == 3
+
+
+def test_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(symptom_search, 'MEMO_SIZE', 3)
+    index = SymptomIndex(KEYS)
+    for query in ['a', 'b', 'c', 'd']:
+        index.search(query)
+    assert list(index._memo) == ['b', 'c', 'd']
+    index.search('B ')  # same normalized query, moved to the back
+    index.search('e')
+    assert list(index._memo) == ['d', 'b', 'e']
+
+
+def test_app2_search_is_debounced(monkeypatch):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    pytest.importorskip('PyQt6.QtWidgets')
+    from PyQt6.QtTest import QTest
+    from PyQt6.QtWidgets import QApplication
+
+    import app2
+
+    app = QApplication.instance() or QApplication([])
+    window = app2.NeuralCareSymptom()
+    queries = []
+    search = window.symptom_index.search
+    monkeypatch.setattr(window.symptom_index, 'search', lambda q: queries.append(q) or search(q))
+    for text in ['f', 'fe', 'fev', 'feve']:
+        window.search.setText(text)
+        QTest.qWait(SEARCH_DEBOUNCE_MS // 4)
+    assert queries == []
+    QTest.qWait(SEARCH_DEBOUNCE_MS * 3)
+    assert queries == ['feve']
+    assert window.symptom_filter == search('feve')
+    window.close()
+    app.processEvents()
@@ -1,15 +1,34 @@
 import sys
-import numpy as np
-import pickle
-import pandas as pd
-import os
+import time
+from functools import lru_cache
+# Imported first so that, when profiling is on, the imports below are timed
+import profiling
+from timing import PhaseTimer
+
+# Started before the heavy imports so they count towards startup time
+STARTUP = PhaseTimer()
+
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                           QLabel, QScrollArea, QCheckBox, QPushButton, 
-                           QLineEdit, QFormLayout, QGroupBox, QGridLayout,
+                           QLabel, QPushButton, QLineEdit, QFormLayout,
+                           QGroupBox, QGridLayout,
                            QStackedWidget, QTextBrowser, QHBoxLayout, QComboBox,
-                           QListWidget, QListWidgetItem, QFrame, QMessageBox)
-from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QRect, QSize
+                           QListWidget, QListWidgetItem, QFrame, QMessageBox,
+                           QProgressBar)
+from PyQt6.QtCore import (Qt, QPropertyAnimation, QEasingCurve, QRect, QSize,
+                          QObject, QThread, QThreadPool, QRunnable, QTimer, pyqtSignal)
 from PyQt6.QtGui import QFont, QColor, QPalette
+from engine import DiagnosisEngine, SYMPTOMS_DICT, DISEASES_LIST
+from knowledge import KnowledgeBase
+from metrics import REGISTRY
+from symptom_picker import SymptomListModel, SymptomView
+from symptom_search import SEARCH_DEBOUNCE_MS, SymptomIndex
+
+# Quiet period after the last symptom toggle before the differential is rescored
+DIFFERENTIAL_DEBOUNCE_MS = 60
+DIFFERENTIAL_SIZE = 5
+
+# How often the sidebar's diagnostics panel refreshes while the sidebar is open
+DEBUG_REFRESH_MS = 1000
 
 # --- Color Palettes ---
 THEMES = {
@@ -37,6 +56,239 @@ THEMES = {
     }
 }
 
+# BMI field text/border colour per status, applied through a dynamic property
+BMI_COLORS = {
+    "underweight": "#fbbf24",  # Amber
+    "normal": "#22c55e",  # Green
+    "overweight": "#f97316",  # Orange
+    "obese": "#ef4444",  # Red
+    "invalid": "#ef4444",
+}
+
+
+@lru_cache(maxsize=None)
+def build_stylesheet(theme, fs):
+    """Window QSS for a palette and base font size, built once per pair"""
+    p = THEMES[theme]
+    return f"""
+        * {{ font-family: 'Segoe UI', system-ui; }}
+        
+        QMainWindow {{ background-color: {p['main_bg']}; }}
+        
+        QFrame#Header {{ 
+            background-color: {p['main_bg']}; 
+            border-bottom: 1px solid {p['border']};
+        }}
+        
+        QFrame#Sidebar {{
+            background-color: {p['sidebar']};
+            border-bottom-right-radius: 20px;
+            border-right: 1px solid {p['border']};
+        }}
+        
+        QLabel#MainTitle {{ color: {p['accent']}; font-size: {fs + 10}px; font-weight: 800; }}
+        QLabel#SubLabel {{ color: {p['text_muted']}; font-size: {fs + 1}px; font-weight: bold; padding-top: 10px; }}
+        QLabel#DebugPanel {{ color: {p['text_muted']}; font-family: monospace; font-size: {max(8, fs - 4)}px; }}
+        QLabel {{ color: {p['text']}; font-size: {fs}px; }}
+
+        QPushButton#MenuBtn {{
+            background-color: transparent;
+            color: {p['text']};
+            border: 1px solid {p['border']};
+            border-radius: 8px;
+            font-size: 18px;
+            font-weight: bold;
+        }}
+        QPushButton#MenuBtn:hover {{ background-color: {p['border']}; }}
+
+        QPushButton#ActionBtn {{
+            background-color: {p['accent']};
+            color: #ffffff;
+            border: none;
+            border-radius: 10px;
+            padding: 8px 20px;
+            font-weight: 700;
+            font-size: {fs}px;
+        }}
+        QPushButton#ActionBtn:hover {{ background-color: {p['accent_hover']}; }}
+
+        QLineEdit, QComboBox, QListWidget, QTextBrowser {{
+            background-color: {p['input_bg']};
+            border: 1px solid {p['border']};
+            border-radius: 8px;
+            color: {p['text']};
+            padding: 8px;
+            font-size: {fs}px;
+        }}
+        
+        QListWidget {{
+            outline: none;
+            background-color: {p['input_bg']};
+            border: 1px solid {p['border']};
+        }}
+        
+        QListWidget::item {{ 
+            background-color: {p['sidebar']};
+            color: {p['text']};
+            padding: 10px; 
+            margin: 4px 8px; 
+            border-radius: 8px;
+            border: 1px solid {p['border']};
+        }}
+        
+        QListWidget::item:hover {{
+            background-color: {p['border']};
+        }}
+        
+        QListWidget::item:selected {{
+            background-color: {p['accent']};
+            color: #ffffff;
+            border-color: {p['accent']};
+        }}
+
+        QGroupBox {{
+            border: 1px solid {p['border']};
+            border-radius: 15px;
+            background-color: {p['card_bg']};
+            margin-top: 10px;
+            padding-top: 30px;
+            color: {p['text']};
+            font-weight: bold;
+            font-size: {fs + 6}px;
+        }}
+
+        QListView#SymptomView {{
+            background-color: transparent;
+            border: none;
+            outline: none;
+            color: {p['text']};
+            font-size: {fs}px;
+        }}
+        QListView#SymptomView::item {{ padding-left: 4px; }}
+        QListView#SymptomView::item:hover {{ color: {p['accent']}; }}
+        QListView#SymptomView::indicator {{
+            width: 20px; height: 20px;
+            border: 2px solid {p['border']};
+            border-radius: 5px;
+            background-color: {p['main_bg']};
+        }}
+        QListView#SymptomView::indicator:checked {{
+            background-color: {p['accent']};
+            border-color: {p['accent']};
+        }}
+
+        QProgressBar#DiffBar {{
+            background-color: {p['input_bg']};
+            border: 1px solid {p['border']};
+            border-radius: 6px;
+            color: {p['text']};
+            font-size: {fs - 1}px;
+            text-align: left;
+            padding-left: 6px;
+        }}
+        QProgressBar#DiffBar::chunk {{
+            background-color: {p['accent']}55;
+            border-radius: 5px;
+        }}
+
+        QFrame#DiagnosisCard {{
+            background-color: {p['accent']}15; /* 15 is ~8% opacity in hex */
+            border: 2px solid {p['accent']};
+            border-radius: 12px;
+        }}
+
+        QLabel#ResTitle {{ font-size: 20px; font-weight: 800; color: #38bdf8; margin-bottom: 5px; }}
+        QLabel#PatientData {{ line-height: 150%; }}
+        QLabel#SymptomsData {{ font-size: 16px; padding: 10px; }}
+        QLabel#MainDiag {{ font-size: 28px; font-weight: 800; padding-top: 10px; }}
+        QLabel#DiagDesc {{ color: #94a3b8; font-size: 16px; line-height: 140%; padding-bottom: 10px; padding-left: 10px; }}
+
+        QLineEdit#BmiField[status="invalid"] {{ color: {BMI_COLORS['invalid']}; }}
+        QLineEdit#BmiField[status="underweight"] {{ color: {BMI_COLORS['underweight']}; font-weight: bold; border-color: {BMI_COLORS['underweight']}; }}
+        QLineEdit#BmiField[status="normal"] {{ color: {BMI_COLORS['normal']}; font-weight: bold; border-color: {BMI_COLORS['normal']}; }}
+        QLineEdit#BmiField[status="overweight"] {{ color: {BMI_COLORS['overweight']}; font-weight: bold; border-color: {BMI_COLORS['overweight']}; }}
+        QLineEdit#BmiField[status="obese"] {{ color: {BMI_COLORS['obese']}; font-weight: bold; border-color: {BMI_COLORS['obese']}; }}
+        """
+
+
+class ModelLoader(QObject):
+    """Loads the knowledge base and model on a worker thread"""
+    progress = pyqtSignal(int, str)
+    loaded = pyqtSignal(object, object)
+
+    def __init__(self, timer):
+        super().__init__()
+        self.timer = timer
+
+    @profiling.profile_calls('model_load')
+    def run(self):
+        self.progress.emit(10, "Loading knowledge base...")
+        with self.timer.phase("knowledge"):
+            try:
+                knowledge = KnowledgeBase.load()
+            except Exception as e:
+                print(f"Error loading knowledge data: {e}")
+                knowledge = KnowledgeBase({})
+
+        engine = DiagnosisEngine()
+        with self.timer.phase("fallback"):
+            engine.set_training_records(knowledge.symptom_rows)
+
+        self.progress.emit(35, "Loading AI model...")
+        with self.timer.phase("model"):
+            engine.load_model()
+
+        self.progress.emit(100, "Ready")
+        self.loaded.emit(engine, knowledge)
+
+
+class AnalysisSignals(QObject):
+    done = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class AnalysisTask(QRunnable):
+    """Runs inference and the knowledge lookup off the GUI thread"""
+
+    def __init__(self, seq, engine, knowledge, symptoms):
+        super().__init__()
+        self.seq = seq
+        self.engine = engine
+        self.knowledge = knowledge
+        self.symptoms = symptoms
+        self.signals = AnalysisSignals()
+
+    @profiling.profile_calls('analysis')
+    def run(self):
+        try:
+            res = self.engine.predict(self.symptoms)
+            with REGISTRY.stage('knowledge'):
+                info = self.knowledge.get(res)
+            self.signals.done.emit(self.seq, info)
+        except Exception as e:
+            REGISTRY.inc('errors')
+            self.signals.failed.emit(self.seq, str(e))
+
+
+class DifferentialTask(QRunnable):
+    """Scores the top-k differential for the symptoms picked so far"""
+
+    def __init__(self, seq, engine, symptoms, k):
+        super().__init__()
+        self.seq = seq
+        self.engine = engine
+        self.symptoms = symptoms
+        self.k = k
+        self.signals = AnalysisSignals()
+
+    def run(self):
+        try:
+            self.signals.done.emit(self.seq, self.engine.predict_top(self.symptoms, self.k))
+        except Exception as e:
+            REGISTRY.inc('errors')
+            self.signals.failed.emit(self.seq, str(e))
+
+
 class NeuralCareSymptom(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -44,18 +296,45 @@ class NeuralCareSymptom(QMainWindow):
         # State
         self.current_theme = "System"
         self.scale_pnt = 100
+        self.applied_style = None  # (palette, font size) of the current stylesheet
         self.sidebar_expanded = False
         self.sidebar_width = 175
-        self.symptom_checks = {}
+        self.sel_items = {}  # symptom key -> its QListWidgetItem in the selected list
         self.model = None
         self.model_loaded = False
+        self.model_ready = False
+        self.startup = STARTUP
+        REGISTRY.add_collector(self.startup.metrics)
+        self.submit_started = None  # perf_counter() of the click being answered
+        self.symptoms_dict = SYMPTOMS_DICT
+        self.diseases_list = DISEASES_LIST
+        self.engine = DiagnosisEngine()
+        self.knowledge = KnowledgeBase({})
+        # Only the newest analysis request is ever displayed
+        self.analysis_pool = QThreadPool(self)
+        self.analysis_pool.setMaxThreadCount(1)
+        self.analysis_seq = 0
+        self.analysis_tasks = {}  # seq -> task, keeps runnables alive until they report
+        # Live differential: toggles restart the debounce timer, one worker scores
+        self.diff_pool = QThreadPool(self)
+        self.diff_pool.setMaxThreadCount(1)
+        self.diff_seq = 0
+        self.diff_tasks = {}
+        self.diff_timer = QTimer(self)
+        self.diff_timer.setSingleShot(True)
+        self.diff_timer.setInterval(DIFFERENTIAL_DEBOUNCE_MS)
+        self.diff_timer.timeout.connect(self.start_differential)
+        self.symptom_index = SymptomIndex(self.symptoms_dict)
+        self.symptom_filter = None
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_search)
         
         # Window
         self.setWindowTitle('NeuralCare-Symptom')
         self.setMinimumSize(1000, 800)
         
-        self.load_model_and_data()
-        
         # Root Layout: [Header] (Row 1) -> [Body] (Row 2)
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -93,6 +372,28 @@ class NeuralCareSymptom(QMainWindow):
         self.sidebar_anim.setEasingCurve(QEasingCurve.Type.InOutSine)
 
         self.apply_theme()
+        self.startup.milestone("window built")
+
+        # Model and data load in the background; ANALYZE NOW waits for them
+        self.load_model_and_data()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Runs once the event loop is back, i.e. after the first paint
+        QTimer.singleShot(0, lambda: self.startup.milestone("first paint"))
+
+    def closeEvent(self, event):
+        if self.loader_thread.isRunning():
+            self.loader_thread.quit()
+            self.loader_thread.wait()
+        self.analysis_seq += 1
+        self.analysis_pool.clear()
+        self.analysis_pool.waitForDone()
+        self.diff_timer.stop()
+        self.diff_seq += 1
+        self.diff_pool.clear()
+        self.diff_pool.waitForDone()
+        super().closeEvent(event)
 
     def setup_header(self):
         header = QFrame()
@@ -114,8 +415,19 @@ class NeuralCareSymptom(QMainWindow):
 
         layout.addStretch()
 
+        # Startup progress, hidden once the model is ready
+        self.load_label = QLabel("Starting...", objectName="SubLabel")
+        layout.addWidget(self.load_label)
+        self.load_bar = QProgressBar()
+        self.load_bar.setRange(0, 100)
+        self.load_bar.setTextVisible(False)
+        self.load_bar.setFixedSize(140, 6)
+        layout.addWidget(self.load_bar)
+        layout.addSpacing(15)
+
         self.submit_btn = QPushButton("ANALYZE NOW")
         self.submit_btn.setObjectName("ActionBtn")
+        self.submit_btn.setEnabled(False)
         self.submit_btn.clicked.connect(self.submit_form)
         layout.addWidget(self.submit_btn)
 
@@ -144,128 +456,38 @@ class NeuralCareSymptom(QMainWindow):
         self.scale_combo.currentTextChanged.connect(self.on_scale_changed)
         vbox.addWidget(self.scale_combo)
 
+        vbox.addSpacing(15)
+
+        # Timings and counters, refreshed only while the sidebar is open
+        vbox.addWidget(QLabel("DIAGNOSTICS", objectName="SubLabel"))
+        self.debug_panel = QLabel(objectName="DebugPanel")
+        self.debug_panel.setTextFormat(Qt.TextFormat.PlainText)
+        vbox.addWidget(self.debug_panel)
+        self.debug_timer = QTimer(self)
+        self.debug_timer.setInterval(DEBUG_REFRESH_MS)
+        self.debug_timer.timeout.connect(self.refresh_debug_panel)
+
         vbox.addStretch()
 
     def apply_theme(self):
-        p = THEMES["Dark" if self.current_theme == "System" else self.current_theme]
+        theme = "Dark" if self.current_theme == "System" else self.current_theme
         # Safeguard font size to be at least 8pt
         fs = max(8, int(14 * (self.scale_pnt / 100)))
-        
-        qss = f"""
-        * {{ font-family: 'Segoe UI', system-ui; }}
-        
-        QMainWindow {{ background-color: {p['main_bg']}; }}
-        
-        QFrame#Header {{ 
-            background-color: {p['main_bg']}; 
-            border-bottom: 1px solid {p['border']};
-        }}
-        
-        QFrame#Sidebar {{
-            background-color: {p['sidebar']};
-            border-bottom-right-radius: 20px;
-            border-right: 1px solid {p['border']};
-        }}
-        
-        QLabel#MainTitle {{ color: {p['accent']}; font-size: {fs + 10}px; font-weight: 800; }}
-        QLabel#SubLabel {{ color: {p['text_muted']}; font-size: {fs + 1}px; font-weight: bold; padding-top: 10px; }}
-        QLabel {{ color: {p['text']}; font-size: {fs}px; }}
-
-        QPushButton#MenuBtn {{
-            background-color: transparent;
-            color: {p['text']};
-            border: 1px solid {p['border']};
-            border-radius: 8px;
-            font-size: 18px;
-            font-weight: bold;
-        }}
-        QPushButton#MenuBtn:hover {{ background-color: {p['border']}; }}
-
-        QPushButton#ActionBtn {{
-            background-color: {p['accent']};
-            color: #ffffff;
-            border: none;
-            border-radius: 10px;
-            padding: 8px 20px;
-            font-weight: 700;
-            font-size: {fs}px;
-        }}
-        QPushButton#ActionBtn:hover {{ background-color: {p['accent_hover']}; }}
-
-        QLineEdit, QComboBox, QListWidget, QTextBrowser {{
-            background-color: {p['input_bg']};
-            border: 1px solid {p['border']};
-            border-radius: 8px;
-            color: {p['text']};
-            padding: 8px;
-            font-size: {fs}px;
-        }}
-        
-        QListWidget {{
-            outline: none;
-            background-color: {p['input_bg']};
-            border: 1px solid {p['border']};
-        }}
-        
-        QListWidget::item {{ 
-            background-color: {p['sidebar']};
-            color: {p['text']};
-            padding: 10px; 
-            margin: 4px 8px; 
-            border-radius: 8px;
-            border: 1px solid {p['border']};
-        }}
-        
-        QListWidget::item:hover {{
-            background-color: {p['border']};
-        }}
-        
-        QListWidget::item:selected {{
-            background-color: {p['accent']};
-            color: #ffffff;
-            border-color: {p['accent']};
-        }}
 
-        QGroupBox {{
-            border: 1px solid {p['border']};
-            border-radius: 15px;
-            background-color: {p['card_bg']};
-            margin-top: 10px;
-            padding-top: 30px;
-            color: {p['text']};
-            font-weight: bold;
-            font-size: {fs + 6}px;
-        }}
-
-        QCheckBox {{ color: {p['text']}; spacing: 10px; }}
-        QCheckBox::indicator {{ 
-            width: 20px; height: 20px; 
-            border: 2px solid {p['border']}; 
-            border-radius: 5px; 
-            background-color: {p['main_bg']};
-        }}
-        
-        QCheckBox::indicator:checked {{ 
-            background-color: {p['accent']}; 
-            border-color: {p['accent']};
-        }}
-        
-        QCheckBox::indicator:unchecked:hover {{
-            border-color: {p['accent']};
-        }}
-
-        QScrollArea, QScrollArea > QWidget, QWidget#ScrollContent {{
-            background-color: transparent;
-            border: none;
-        }}
+        self.sidebar.setFixedWidth(self.sidebar_width if self.sidebar_expanded else 0)
+        # Ensure sidebar is visible if expanded
+        if self.sidebar_expanded:
+            self.sidebar.setMinimumWidth(self.sidebar_width)
+        else:
+            self.sidebar.setMinimumWidth(0)
 
-        QFrame#DiagnosisCard {{
-            background-color: {p['accent']}15; /* 15 is ~8% opacity in hex */
-            border: 2px solid {p['accent']};
-            border-radius: 12px;
-        }}
-        """
-        self.setStyleSheet(qss)
+        # Setting a stylesheet re-polishes every widget, so skip no-op switches
+        # such as System -> Dark
+        if (theme, fs) == self.applied_style:
+            return
+        t0 = time.perf_counter()
+        p = THEMES[theme]
+        self.setStyleSheet(build_stylesheet(theme, fs))
 
         # Override palette as a secondary measure for standard widgets
         pal = self.palette()
@@ -275,17 +497,9 @@ class NeuralCareSymptom(QMainWindow):
         pal.setColor(QPalette.ColorRole.Highlight, QColor(p['accent']))
         pal.setColor(QPalette.ColorRole.HighlightedText, QColor("#ffffff"))
         self.setPalette(pal)
-
-        # Update results card style if it exists
-        if hasattr(self, 'res_card_frame'):
-            self.res_card_frame.setStyleSheet(f"background-color: {p['accent']}15; border: 2px solid {p['accent']}; border-radius: 12px;")
-
-        self.sidebar.setFixedWidth(self.sidebar_width if self.sidebar_expanded else 0)
-        # Ensure sidebar is visible if expanded
-        if self.sidebar_expanded:
-            self.sidebar.setMinimumWidth(self.sidebar_width)
-        else:
-            self.sidebar.setMinimumWidth(0)
+        self.applied_style = (theme, fs)
+        # Polish and relayout run from the event loop; time up to when it is idle again
+        QTimer.singleShot(0, lambda: REGISTRY.observe('restyle', time.perf_counter() - t0))
 
     def toggle_sidebar(self):
         if self.sidebar_expanded:
@@ -293,13 +507,39 @@ class NeuralCareSymptom(QMainWindow):
             self.sidebar_anim.setStartValue(self.sidebar_width)
             self.sidebar_anim.setEndValue(0)
             self.sidebar_expanded = False
+            self.debug_timer.stop()
         else:
             self.menu_btn.setText("✕")
             self.sidebar_anim.setStartValue(0)
             self.sidebar_anim.setEndValue(self.sidebar_width)
             self.sidebar_expanded = True
+            self.refresh_debug_panel()
+            self.debug_timer.start()
         self.sidebar_anim.start()
 
+    def refresh_debug_panel(self):
+        """Per-stage p50/p95/p99 in ms, then prediction and cache counters"""
+        def ms(seconds):
+            v = seconds * 1e3
+            return f"{v:5.2f}" if v < 10 else f"{v:5.1f}" if v < 100 else f"{v:5.0f}"
+
+        summary = REGISTRY.summary()
+        lines = [f"{'ms':<9}{'p50':>5}{'p95':>5}{'p99':>5}"]
+        for name, (count, p50, p95, p99) in summary['stages'].items():
+            if count:
+                lines.append(f"{name[:8]:<9}{ms(p50)}{ms(p95)}{ms(p99)}")
+        counters = summary['counters']
+        engine = self.engine.metrics()
+        lines.append("")
+        lines.append(f"predictions {counters.get('predictions', 0)}")
+        lines.append(f"fast path   {engine['fast_path_hits']}/{engine['fast_path_lookups']}")
+        lines.append(f"cache       {engine['cache_hits']}/{engine['cache_hits'] + engine['cache_misses']}")
+        lines.append(f"errors      {counters.get('errors', 0)}")
+        ready = self.startup.milestones.get("ready")
+        if ready is not None:
+            lines.append(f"startup     {ready * 1e3:.0f} ms")
+        self.debug_panel.setText("\n".join(lines))
+
     def on_theme_changed(self, val):
         self.current_theme = val
         self.apply_theme()
@@ -347,7 +587,7 @@ class NeuralCareSymptom(QMainWindow):
         grid.addWidget(QLabel("WEIGHT (kg) *", objectName="SubLabel"), 2, 1)
         grid.addWidget(self.weight_in, 3, 1)
 
-        self.bmi_in = QLineEdit()
+        self.bmi_in = QLineEdit(objectName="BmiField")
         self.bmi_in.setPlaceholderText("BMI Score")
         self.bmi_in.setReadOnly(True)
         self.bmi_in.setFixedWidth(250)
@@ -369,24 +609,15 @@ class NeuralCareSymptom(QMainWindow):
         self.search = QLineEdit()
         self.search.setPlaceholderText("🔍 Search symptoms...")
         self.search.textChanged.connect(self.filter_syms)
+        self.search.returnPressed.connect(self.apply_search)
         left_v.addWidget(self.search)
         
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        self.scroll_content = QWidget()
-        self.scroll_content.setObjectName("ScrollContent")
-        self.g_layout = QGridLayout(self.scroll_content)
-        
-        sorted_keys = sorted(self.symptoms_dict.keys())
-        for i, s in enumerate(sorted_keys):
-            cb = QCheckBox(s.replace('_', ' ').title())
-            cb.setObjectName(s)
-            cb.stateChanged.connect(self.on_check)
-            self.symptom_checks[s] = cb
-            self.g_layout.addWidget(cb, i // 2, i % 2)
-        
-        scroll.setWidget(self.scroll_content)
-        left_v.addWidget(scroll)
+        # Only the rows on screen are ever rendered, whatever the vocabulary size
+        self.symptom_model = SymptomListModel(sorted(self.symptoms_dict.keys()), self)
+        self.symptom_model.checked_changed.connect(self.on_check)
+        self.symptom_view = SymptomView(columns=2)
+        self.symptom_view.setModel(self.symptom_model)
+        left_v.addWidget(self.symptom_view)
         
         sym_layout.addLayout(left_v, 2)
         
@@ -403,6 +634,17 @@ class NeuralCareSymptom(QMainWindow):
         self.remove_btn.setObjectName("SecondaryBtn")
         self.remove_btn.clicked.connect(self.remove_selected_symptoms)
         right_v.addWidget(self.remove_btn)
+
+        # Live differential, rows are reused so an update only sets values
+        right_v.addWidget(QLabel("DIFFERENTIAL", objectName="SubLabel"))
+        self.diff_bars = []
+        for _ in range(DIFFERENTIAL_SIZE):
+            bar = QProgressBar(objectName="DiffBar")
+            bar.setRange(0, 1000)
+            bar.setFixedHeight(22)
+            bar.hide()
+            right_v.addWidget(bar)
+            self.diff_bars.append(bar)
         
         sym_layout.addLayout(right_v, 1)
         
@@ -416,7 +658,7 @@ class NeuralCareSymptom(QMainWindow):
         layout.setContentsMargins(30, 20, 30, 30)
         
         self.res_title = QLabel("PREDICTED CLINICAL REPORT")
-        self.res_title.setStyleSheet("font-size: 20px; font-weight: 800; color: #38bdf8; margin-bottom: 5px;")
+        self.res_title.setObjectName("ResTitle")
         layout.addWidget(self.res_title)
 
         # Header Section: 2 Columns
@@ -428,7 +670,7 @@ class NeuralCareSymptom(QMainWindow):
         self.info_group.setFixedWidth(275) # Fixed width
         self.info_v = QVBoxLayout(self.info_group)
         self.res_patient_data = QLabel()
-        self.res_patient_data.setStyleSheet("line-height: 150%;")
+        self.res_patient_data.setObjectName("PatientData")
         self.info_v.addWidget(self.res_patient_data)
         col1_v.addWidget(self.info_group, 3) # Majority height
 
@@ -445,7 +687,7 @@ class NeuralCareSymptom(QMainWindow):
         self.sym_group = QGroupBox("Analyzed Symptoms")
         sym_h = QVBoxLayout(self.sym_group)
         self.res_symptoms_data = QLabel()
-        self.res_symptoms_data.setStyleSheet("font-size: 16px; padding: 10px;")
+        self.res_symptoms_data.setObjectName("SymptomsData")
         self.res_symptoms_data.setWordWrap(True)
         sym_h.addWidget(self.res_symptoms_data)
         head_row.addWidget(self.sym_group, 1)
@@ -456,13 +698,13 @@ class NeuralCareSymptom(QMainWindow):
         card.setObjectName("DiagnosisCard")
         v_card = QVBoxLayout(card)
         self.main_diag = QLabel("Diagnosis Loading...")
-        self.main_diag.setStyleSheet("font-size: 28px; font-weight: 800; padding-top: 10px;")
+        self.main_diag.setObjectName("MainDiag")
         v_card.addWidget(self.main_diag)
         
         # Integrated Description
         self.res_diag_desc = QLabel()
         self.res_diag_desc.setWordWrap(True)
-        self.res_diag_desc.setStyleSheet("color: #94a3b8; font-size: 16px; line-height: 140%; padding-bottom: 10px; padding-left: 10px;")
+        self.res_diag_desc.setObjectName("DiagDesc")
         v_card.addWidget(self.res_diag_desc)
         layout.addWidget(card)
         
@@ -486,38 +728,82 @@ class NeuralCareSymptom(QMainWindow):
         return page
 
     def filter_syms(self, txt):
-        q = txt.lower()
-        for k, cb in self.symptom_checks.items():
-            cb.setVisible(q in k.replace('_', ' ').lower())
-
-    def on_check(self, state):
-        cb = self.sender()
-        if state == 2:
-            # Check if already in list to avoid duplicates
-            items = self.sel_list.findItems(cb.text(), Qt.MatchFlag.MatchExactly)
-            if not items:
-                item = QListWidgetItem(cb.text())
-                item.setData(Qt.ItemDataRole.UserRole, cb.objectName())
+        # Keystrokes only restart the timer; the grid is filtered once typing pauses
+        self.search_timer.start()
+
+    def apply_search(self):
+        """Show the symptoms matching the search box"""
+        self.search_timer.stop()
+        visible = self.symptom_index.search(self.search.text())
+        if visible != self.symptom_filter:
+            self.symptom_model.set_filter(visible)
+            self.symptom_filter = visible
+
+    def set_symptom_checked(self, key, checked=True):
+        self.symptom_model.set_checked(key, checked)
+
+    def on_check(self, key, checked):
+        """Mirror a picker toggle into the selected list by key, without scanning it"""
+        if checked:
+            if key not in self.sel_items:
+                item = QListWidgetItem(self.symptom_model.label(key))
+                item.setData(Qt.ItemDataRole.UserRole, key)
                 self.sel_list.addItem(item)
+                self.sel_items[key] = item
         else:
-            items = self.sel_list.findItems(cb.text(), Qt.MatchFlag.MatchExactly)
-            for i in items: self.sel_list.takeItem(self.sel_list.row(i))
+            item = self.sel_items.pop(key, None)
+            if item is not None:
+                self.sel_list.takeItem(self.sel_list.row(item))
+        # Coalesce bursts of toggles into one rescoring
+        self.diff_timer.start()
 
-    def remove_selected_symptoms(self):
-        """Removes selected items from list and unchecks corresponding checkboxes"""
-        selected_items = self.sel_list.selectedItems()
-        if not selected_items:
+    def selected_symptoms(self):
+        return [self.sel_list.item(i).data(Qt.ItemDataRole.UserRole) for i in range(self.sel_list.count())]
+
+    def start_differential(self):
+        """Rescore the differential in the background, superseding any queued run"""
+        pending = self.diff_tasks.get(self.diff_seq)
+        if pending is not None and self.diff_pool.tryTake(pending):
+            del self.diff_tasks[self.diff_seq]
+        self.diff_seq += 1
+        syms = self.selected_symptoms()
+        if not syms or not self.model_loaded:
+            self.show_differential([])
             return
-            
-        for item in selected_items:
-            symptom_key = item.data(Qt.ItemDataRole.UserRole)
-            if symptom_key in self.symptom_checks:
-                # Unchecking the checkbox will trigger on_check which removes the item from the list
-                # However, to avoid issues during loop, we block signals or handle it carefully
-                self.symptom_checks[symptom_key].setChecked(False)
+        task = DifferentialTask(self.diff_seq, self.engine, syms, DIFFERENTIAL_SIZE)
+        task.setAutoDelete(False)
+        task.signals.done.connect(self.on_differential_done)
+        task.signals.failed.connect(self.on_differential_failed)
+        self.diff_tasks[self.diff_seq] = task
+        self.diff_pool.start(task)
+
+    def on_differential_done(self, seq, ranked):
+        self.diff_tasks.pop(seq, None)
+        if seq == self.diff_seq:
+            self.show_differential(ranked)
+
+    def on_differential_failed(self, seq, msg):
+        self.diff_tasks.pop(seq, None)
+        if seq == self.diff_seq:
+            print(f"Error scoring differential: {msg}")
+            self.show_differential([])
+
+    def show_differential(self, ranked):
+        for i, bar in enumerate(self.diff_bars):
+            if i < len(ranked):
+                name, p = ranked[i]
+                bar.setValue(round(p * 1000))
+                bar.setFormat(f"{name}  {p * 100:.1f}%")
+                bar.show()
             else:
-                # Fallback if somehow key isn't found
-                self.sel_list.takeItem(self.sel_list.row(item))
+                bar.hide()
+
+    def remove_selected_symptoms(self):
+        """Removes selected items from list and unchecks them in the picker"""
+        selected_keys = [item.data(Qt.ItemDataRole.UserRole) for item in self.sel_list.selectedItems()]
+        for symptom_key in selected_keys:
+            # Unchecking triggers on_check, which removes the list entry
+            self.symptom_model.set_checked(symptom_key, False)
 
     def validate(self):
         # Age, Gender, Height, Weight compulsory
@@ -548,13 +834,18 @@ class NeuralCareSymptom(QMainWindow):
             return False
         return True
 
+    @profiling.profile_calls('submit')
     def submit_form(self):
+        if not self.model_ready:
+            return
         if self.stack.currentIndex() == 1:
             self.reset_app()
             return
             
         if not self.validate(): return
-        
+        self.submit_started = time.perf_counter()
+        html_started = self.submit_started
+
         # Collect info
         name = self.name_in.text().strip()
         age = self.age_in.text().strip()
@@ -575,30 +866,58 @@ class NeuralCareSymptom(QMainWindow):
         # Build Symptoms string
         selected_texts = [self.sel_list.item(i).text() for i in range(self.sel_list.count())]
         self.res_symptoms_data.setText(" • " + " • ".join(selected_texts))
+        REGISTRY.observe('html', time.perf_counter() - html_started)
 
-        syms = [self.sel_list.item(i).data(Qt.ItemDataRole.UserRole) for i in range(self.sel_list.count())]
-        v = np.zeros(len(self.symptoms_dict))
-        for s in syms:
-            if s in self.symptoms_dict: v[self.symptoms_dict[s]] = 1
-        
-        df = pd.DataFrame([v], columns=list(self.symptoms_dict.keys()))
+        syms = self.selected_symptoms()
         
         if not self.model:
             QMessageBox.critical(self, "Model Error", "The AI model could not be loaded. Please check your installation.")
             return
 
-        res = self.diseases_list.get(self.model.predict(df)[0], "Unknown")
+        self.start_analysis(syms)
+
+    def start_analysis(self, syms):
+        """Queue inference on the worker pool, superseding any pending request"""
+        pending = self.analysis_tasks.get(self.analysis_seq)
+        if pending is not None and self.analysis_pool.tryTake(pending):
+            del self.analysis_tasks[self.analysis_seq]
+        self.analysis_seq += 1
+        task = AnalysisTask(self.analysis_seq, self.engine, self.knowledge, syms)
+        task.setAutoDelete(False)
+        task.signals.done.connect(self.on_analysis_done)
+        task.signals.failed.connect(self.on_analysis_failed)
+        self.analysis_tasks[self.analysis_seq] = task
+        self.submit_btn.setText("ANALYZING...")
+        self.analysis_pool.start(task)
+
+    @profiling.profile_calls('render')
+    def on_analysis_done(self, seq, info):
+        self.analysis_tasks.pop(seq, None)
+        if seq != self.analysis_seq:
+            return  # stale result from a superseded request
         
         # Display data
-        self.main_diag.setText(res)
-        self.res_diag_desc.setText(self.get_data(self.sym_des, res, 'Description'))
-        
-        self.b_prec.setHtml(self.get_data_list(self.precautions, res, ['Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4']))
-        self.b_meds.setHtml(self.get_data_list(self.medications, res, ['Medication']))
-        self.b_diet.setHtml(self.get_data_list(self.diets, res, ['Diet']))
-        self.b_work.setHtml(self.get_data_list(self.workout, res, ['workout']))
-        
-        self.stack.setCurrentIndex(1)
+        with REGISTRY.stage('render'):
+            self.main_diag.setText(info.name)
+            self.res_diag_desc.setText(info.description)
+
+            self.b_prec.setHtml(info.precautions_html)
+            self.b_meds.setHtml(info.medications_html)
+            self.b_diet.setHtml(info.diets_html)
+            self.b_work.setHtml(info.workouts_html)
+
+            self.stack.setCurrentIndex(1)
+            self.on_page_changed(1)
+        if self.submit_started is not None:
+            REGISTRY.observe('submit', time.perf_counter() - self.submit_started)
+            self.submit_started = None
+
+    def on_analysis_failed(self, seq, msg):
+        self.analysis_tasks.pop(seq, None)
+        if seq != self.analysis_seq:
+            return
+        self.on_page_changed(self.stack.currentIndex())
+        QMessageBox.critical(self, "Analysis Error", f"Unable to make a prediction: {msg}")
 
     def on_page_changed(self, index):
         if index == 0:
@@ -609,36 +928,6 @@ class NeuralCareSymptom(QMainWindow):
     def go_back_to_edit(self):
         self.stack.setCurrentIndex(0)
 
-    def get_data(self, df, disease, col):
-        try: return df[df['Disease' if 'Disease' in df.columns else 'disease'] == disease][col].iloc[0]
-        except: return "Detailed data unavailable."
-
-    def get_data_list(self, df, disease, cols):
-        try:
-            row = df[df['Disease' if 'Disease' in df.columns else 'disease'] == disease][cols].values[0]
-            items = []
-            for raw_val in row:
-                val = str(raw_val)
-                if val.lower() == 'nan' or not val.strip():
-                    continue
-                
-                # Handle string-represented lists e.g. "['a', 'b']"
-                if val.startswith('[') and val.endswith(']'):
-                    try:
-                        import ast
-                        actual_list = ast.literal_eval(val)
-                        if isinstance(actual_list, list):
-                            items.extend([str(x) for x in actual_list])
-                            continue
-                    except:
-                        pass
-                
-                items.append(val)
-                
-            if not items: return "<ul><li>N/A</li></ul>"
-            return "<ul>" + "".join([f"<li>{x}</li>" for x in items]) + "</ul>"
-        except: return "<ul><li>N/A</li></ul>"
-
     def calculate_bmi(self):
         """Calculates BMI and updates display with status"""
         try:
@@ -647,7 +936,7 @@ class NeuralCareSymptom(QMainWindow):
             
             if not h_text or not w_text:
                 self.bmi_in.clear()
-                self.bmi_in.setStyleSheet("")
+                self.set_bmi_status("")
                 return
 
             h = float(h_text)
@@ -657,65 +946,86 @@ class NeuralCareSymptom(QMainWindow):
                 bmi = w / ((h / 100) ** 2)
                 
                 status = ""
-                color = ""
                 if bmi < 18.5:
                     status = "Underweight"
-                    color = "#fbbf24" # Amber
                 elif 18.5 <= bmi < 25:
                     status = "Normal"
-                    color = "#22c55e" # Green
                 elif 25 <= bmi < 30:
                     status = "Overweight"
-                    color = "#f97316" # Orange
                 else:
                     status = "Obese"
-                    color = "#ef4444" # Red
                 
                 self.bmi_in.setText(f"{bmi:.1f} ({status})")
-                self.bmi_in.setStyleSheet(f"color: {color}; font-weight: bold; border-color: {color};")
+                self.set_bmi_status(status.lower())
             else:
                 self.bmi_in.clear()
-                self.bmi_in.setStyleSheet("")
+                self.set_bmi_status("")
         except ValueError:
             self.bmi_in.setText("Invalid Input")
-            self.bmi_in.setStyleSheet("color: #ef4444;")
+            self.set_bmi_status("invalid")
+
+    def set_bmi_status(self, status):
+        """Colour the BMI field via its QSS rule, re-polishing it only when the status changes"""
+        if self.bmi_in.property("status") == status:
+            return
+        self.bmi_in.setProperty("status", status)
+        self.bmi_in.style().unpolish(self.bmi_in)
+        self.bmi_in.style().polish(self.bmi_in)
 
     def reset_app(self):
+        self.analysis_seq += 1  # drop any result still in flight
         self.age_in.clear()
         self.height_in.clear()
         self.weight_in.clear()
         self.name_in.clear()
+        self.symptom_model.clear_checks()
         self.sel_list.clear()
-        for c in self.symptom_checks.values(): c.setChecked(False)
+        self.sel_items.clear()
+        self.diff_timer.stop()
+        self.diff_seq += 1
+        self.show_differential([])
         self.stack.setCurrentIndex(0)
-        self.submit_btn.setEnabled(True)
+        self.submit_btn.setEnabled(self.model_ready)
 
     def load_model_and_data(self):
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        data_path = os.path.join(base_path, "..", "data")
-        model_path = os.path.join(base_path, "..", "model.pkl")
+        self.loader_thread = QThread(self)
+        self.loader = ModelLoader(self.startup)
+        self.loader.moveToThread(self.loader_thread)
+        self.loader_thread.started.connect(self.loader.run)
+        self.loader.progress.connect(self.on_load_progress)
+        self.loader.loaded.connect(self.on_model_ready)
+        self.loader.loaded.connect(self.loader_thread.quit)
+        self.loader_thread.start()
 
-        self.symptoms_dict = {'itching': 0, 'skin_rash': 1, 'nodal_skin_eruptions': 2, 'continuous_sneezing': 3, 'shivering': 4, 'chills': 5, 'joint_pain': 6, 'stomach_pain': 7, 'acidity': 8, 'ulcers_on_tongue': 9, 'muscle_wasting': 10, 'vomiting': 11, 'burning_micturition': 12, 'spotting_ urination': 13, 'fatigue': 14, 'weight_gain': 15, 'anxiety': 16, 'cold_hands_and_feets': 17, 'mood_swings': 18, 'weight_loss': 19, 'restlessness': 20, 'lethargy': 21, 'patches_in_throat': 22, 'irregular_sugar_level': 23, 'cough': 24, 'high_fever': 25, 'sunken_eyes': 26, 'breathlessness': 27, 'sweating': 28, 'dehydration': 29, 'indigestion': 30, 'headache': 31, 'yellowish_skin': 32, 'dark_urine': 33, 'nausea': 34, 'loss_of_appetite': 35, 'pain_behind_the_eyes': 36, 'back_pain': 37, 'constipation': 38, 'abdominal_pain': 39, 'diarrhoea': 40, 'mild_fever': 41, 'yellow_urine': 42, 'yellowing_of_eyes': 43, 'acute_liver_failure': 44, 'fluid_overload': 45, 'swelling_of_stomach': 46, 'swelled_lymph_nodes': 47, 'malaise': 48, 'blurred_and_distorted_vision': 49, 'phlegm': 50, 'throat_irritation': 51, 'redness_of_eyes': 52, 'sinus_pressure': 53, 'runny_nose': 54, 'congestion': 55, 'chest_pain': 56, 'weakness_in_limbs': 57, 'fast_heart_rate': 58, 'pain_during_bowel_movements': 59, 'pain_in_anal_region': 60, 'bloody_stool': 61, 'irritation_in_anus': 62, 'neck_pain': 63, 'dizziness': 64, 'cramps': 65, 'bruising': 66, 'obesity': 67, 'swollen_legs': 68, 'swollen_blood_vessels': 69, 'puffy_face_and_eyes': 70, 'enlarged_thyroid': 71, 'brittle_nails': 72, 'swollen_extremeties': 73, 'excessive_hunger': 74, 'extra_marital_contacts': 75, 'drying_and_tingling_lips': 76, 'slurred_speech': 77, 'knee_pain': 78, 'hip_joint_pain': 79, 'muscle_weakness': 80, 'stiff_neck': 81, 'swelling_joints': 82, 'movement_stiffness': 83, 'spinning_movements': 84, 'loss_of_balance': 85, 'unsteadiness': 86, 'weakness_of_one_body_side': 87, 'loss_of_smell': 88, 'bladder_discomfort': 89, 'foul_smell_of urine': 90, 'continuous_feel_of_urine': 91, 'passage_of_gases': 92, 'internal_itching': 93, 'toxic_look_(typhos)': 94, 'depression': 95, 'irritability': 96, 'muscle_pain': 97, 'altered_sensorium': 98, 'red_spots_over_body': 99, 'belly_pain': 100, 'abnormal_menstruation': 101, 'dischromic _patches': 102, 'watering_from_eyes': 103, 'increased_appetite': 104, 'polyuria': 105, 'family_history': 106, 'mucoid_sputum': 107, 'rusty_sputum': 108, 'lack_of_concentration': 109, 'visual_disturbances': 110, 'receiving_blood_transfusion': 111, 'receiving_unsterile_injections': 112, 'coma': 113, 'stomach_bleeding': 114, 'distention_of_abdomen': 115, 'history_of_alcohol_consumption': 116, 'fluid_overload.1': 117, 'blood_in_sputum': 118, 'prominent_veins_on_calf': 119, 'palpitations': 120, 'painful_walking': 121, 'pus_filled_pimples': 122, 'blackheads': 123, 'scurring': 124, 'skin_peeling': 125, 'silver_like_dusting': 126, 'small_dents_in_nails': 127, 'inflammatory_nails': 128, 'blister': 129, 'red_sore_around_nose': 130, 'yellow_crust_ooze': 131}
-        self.diseases_list = {15: 'Fungal infection', 4: 'Allergy', 16: 'GERD', 9: 'Chronic cholestasis', 14: 'Drug Reaction', 33: 'Peptic ulcer diseae', 1: 'AIDS', 12: 'Diabetes ', 17: 'Gastroenteritis', 6: 'Bronchial Asthma', 23: 'Hypertension ', 30: 'Migraine', 7: 'Cervical spondylosis', 32: 'Paralysis (brain hemorrhage)', 28: 'Jaundice', 29: 'Malaria', 8: 'Chicken pox', 11: 'Dengue', 37: 'Typhoid', 40: 'hepatitis A', 19: 'Hepatitis B', 20: 'Hepatitis C', 21: 'Hepatitis D', 22: 'Hepatitis E', 3: 'Alcoholic hepatitis', 36: 'Tuberculosis', 10: 'Common Cold', 34: 'Pneumonia', 13: 'Dimorphic hemmorhoids(piles)', 18: 'Heart attack', 39: 'Varicose veins', 26: 'Hypothyroidism', 24: 'Hyperthyroidism', 25: 'Hypoglycemia', 31: 'Osteoarthristis', 5: 'Arthritis', 0: '(vertigo) Paroymsal  Positional Vertigo', 2: 'Acne', 38: 'Urinary tract infection', 35: 'Psoriasis', 27: 'Impetigo'}
+    def on_load_progress(self, pct, msg):
+        self.load_bar.setValue(pct)
+        self.load_label.setText(msg)
 
-        try:
-            self.sym_des = pd.read_csv(os.path.join(data_path, "description.csv"))
-            self.precautions = pd.read_csv(os.path.join(data_path, "precautions_df.csv"))
-            self.medications = pd.read_csv(os.path.join(data_path, "medications.csv"))
-            self.diets = pd.read_csv(os.path.join(data_path, "diets.csv"))
-            self.workout = pd.read_csv(os.path.join(data_path, "workout_df.csv"))
-        except: pass
+    def on_model_ready(self, engine, knowledge):
+        self.engine = engine
+        REGISTRY.add_collector(engine.metrics, 'counter')
+        self.knowledge = knowledge
+        self.model = engine.model
+        self.model_loaded = engine.model_loaded
+        self.model_ready = True
 
-        try:
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            self.model_loaded = True
-        except Exception as e:
-            print(f"Error loading model from {model_path}: {e}")
-            self.model_loaded = False
+        self.load_bar.hide()
+        if engine.using_fallback:
+            self.load_label.setText("Fast mode" if engine.mode == 'fast' else "Fallback model")
+        else:
+            self.load_label.setText("Model unavailable")
+        self.load_label.setVisible(not self.model_loaded or engine.using_fallback)
+        self.submit_btn.setEnabled(True)
+        if self.sel_list.count():
+            self.start_differential()
+
+        self.startup.milestone("ready")
+        print(f"Startup: {self.startup.report()}")
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    window = NeuralCareSymptom()
-    window.show()
+    STARTUP.milestone("imports")
+    with profiling.profiled('startup'):
+        window = NeuralCareSymptom()
+        window.show()
     sys.exit(app.exec())
@@ -0,0 +1,142 @@
+"""Asyncio HTTP front end that micro-batches concurrent /predict requests"""
+import argparse
+import asyncio
+import socket
+import time
+from urllib.parse import urlsplit
+
+import profiling
+from batching import MAX_BATCH_SIZE, MAX_WAIT, MicroBatcher
+from prefork import run_workers
+from metrics import REGISTRY
+from server import (DEFAULT_HOST, DEFAULT_PORT, IDLE_TIMEOUT, InferenceService, RequestError, check_length,
+                    encode_payload, parse_json)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 411: 'Length Required',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class AsyncInferenceServer:
+    """Serves the InferenceService API from one event loop.
+
+    Every /predict request, single patient or batch, is queued on a
+    MicroBatcher, so concurrent requests share one N x 132 model call.
+    ``GET /stats`` returns the batch-size and queue-wait histograms.
+    """
+
+    def __init__(self, service, max_batch=MAX_BATCH_SIZE, max_wait=MAX_WAIT):
+        self.service = service
+        self.batcher = MicroBatcher(service.engine.predict_batch, max_batch, max_wait)
+
+    async def handle(self, method, path, body):
+        if method == 'GET' and path == '/stats':
+            return 200, self.batcher.stats()
+        if not (method == 'POST' and path == '/predict'):
+            return self.service.handle(method, path, body)
+        self.service.count()
+        t = time.perf_counter()
+        try:
+            parsed = self.service.parse_predict(parse_json(body))
+            diseases = await self.batcher.predict(self.service.scored(parsed[0]))
+            if parsed[3] is not None:
+                # The differential takes the engine's row lock, keep it off the loop
+                return await asyncio.get_running_loop().run_in_executor(
+                    None, self.service.predict_response, parsed, diseases)
+            return self.service.predict_response(parsed, diseases)
+        except RequestError as e:
+            REGISTRY.inc('client_errors')
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            REGISTRY.inc('errors')
+            print(f"Error handling {method} {path}: {e}")
+            return 500, {'error': "internal error"}
+        finally:
+            REGISTRY.observe('http', time.perf_counter() - t)
+
+    async def serve_connection(self, reader, writer):
+        """HTTP/1.1 keep-alive loop for one client connection"""
+        try:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                if not line:
+                    break
+                method, target, version = line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                body = b''
+                try:
+                    length = int(headers.get('content-length', '0'))
+                    check_length(length)
+                    if length:
+                        body = await reader.readexactly(length)
+                except ValueError:
+                    status, payload, keep_alive = 400, {'error': "invalid Content-Length"}, False
+                except RequestError as e:
+                    status, payload, keep_alive = e.status, {'error': str(e)}, False
+                else:
+                    status, payload = await self.handle(method, urlsplit(target).path, body)
+
+                data, content_type = encode_payload(payload)
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, sock):
+        server = await asyncio.start_server(self.serve_connection, sock=sock)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve predictions over HTTP with micro-batching")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="interface to bind (localhost only by default)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH_SIZE, help="patients per model call")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT * 1e3,
+                        help="longest a request waits for a batch to fill")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="pre-forked worker processes sharing the loaded model")
+    parser.add_argument('--mode', choices=('full', 'fast'), help="engine mode (default: NEURALCARE_MODE)")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    with profiling.profiled('startup'):
+        service = InferenceService.create(args.mode)
+    _, health = service.health()
+    print(f"Loaded {health['model']} in {(time.perf_counter() - t) * 1e3:.0f} ms")
+
+    app = AsyncInferenceServer(service, args.max_batch, args.max_wait_ms / 1e3)
+    sock = socket.create_server((args.host, args.port))
+    print(f"Serving on http://{args.host}:{sock.getsockname()[1]} with {args.processes} processes "
+          f"(batches of up to {args.max_batch}, max wait {args.max_wait_ms:g} ms)")
+    try:
+        if args.processes > 1:
+            # Each worker runs its own event loop on the shared socket
+            run_workers(args.processes, lambda: asyncio.run(app.serve(sock)))
+        else:
+            asyncio.run(app.serve(sock))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Asyncio micro-batching of concurrent predictions into single model calls"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import REGISTRY, SIZE_BUCKETS
+
+# Patients per model call before a batch is dispatched without waiting
+MAX_BATCH_SIZE = 64
+# Longest a request waits for company before its batch is dispatched (seconds).
+# 0 still batches whatever arrives in the same loop iteration or while the
+# previous batch runs; raise it when a model call costs more than parsing
+MAX_WAIT = 0.0
+
+
+class MicroBatcher:
+    """Coalesces concurrent ``predict`` calls into one ``predict_batch`` call.
+
+    A batch is dispatched once it holds ``max_batch`` patients or its oldest
+    request has waited ``max_wait``. Only one batch runs at a time, on
+    ``executor``; whatever queues up meanwhile forms the next batch the
+    moment it finishes, so batches grow with load and a lone request still
+    only waits ``max_wait``. Requests are never split across batches, so a
+    request bigger than ``max_batch`` runs as a batch of its own.
+
+    ``batch_sizes`` counts patients per model call, ``queue_wait`` the
+    seconds from enqueueing to dispatch, both as histograms that are also
+    exported on /metrics.
+    """
+
+    def __init__(self, predict_batch, max_batch=MAX_BATCH_SIZE, max_wait=MAX_WAIT, executor=None):
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = executor or ThreadPoolExecutor(1, thread_name_prefix='neuralcare-batch')
+        self.queue = deque()  # (patients, future, enqueued at)
+        self.queued = 0  # patients in queue
+        self.running = False
+        self.timer = None
+        self.batch_sizes = REGISTRY.histogram('batch_size', SIZE_BUCKETS, "Patients per micro-batch model call")
+        self.queue_wait = REGISTRY.histogram('queue_wait_seconds', help="Seconds from enqueueing to dispatch")
+
+    async def predict(self, patients):
+        """One prediction per patient, computed together with other callers"""
+        if not patients:
+            return []
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append((patients, future, time.perf_counter()))
+        self.queued += len(patients)
+        self.schedule()
+        return await future
+
+    def schedule(self):
+        if self.running or not self.queue:
+            return
+        if self.queued >= self.max_batch:
+            self.dispatch()
+        elif self.timer is None:
+            wait = self.queue[0][2] + self.max_wait - time.perf_counter()
+            self.timer = asyncio.get_running_loop().call_later(max(wait, 0), self.on_timer)
+
+    def on_timer(self):
+        self.timer = None
+        if not self.running:
+            self.dispatch()
+
+    def dispatch(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, size = [], 0
+        while self.queue and (not batch or size + len(self.queue[0][0]) <= self.max_batch):
+            item = self.queue.popleft()
+            batch.append(item)
+            size += len(item[0])
+        self.queued -= size
+
+        now = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_wait.observe(now - enqueued)
+        self.batch_sizes.observe(size)
+
+        patients = [p for item in batch for p in item[0]]
+        self.running = True
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.predict_batch, patients)
+        future.add_done_callback(lambda f: self.finish(batch, f))
+
+    def finish(self, batch, future):
+        self.running = False
+        error = future.exception()
+        results = None if error else future.result()
+        start = 0
+        for patients, waiter, _ in batch:
+            if waiter.cancelled():
+                pass
+            elif error:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(results[start:start + len(patients)])
+            start += len(patients)
+        # Whatever queued up during this batch has waited long enough already
+        if self.queue:
+            self.dispatch()
+
+    def stats(self):
+        return {
+            'max_batch': self.max_batch,
+            'max_wait': self.max_wait,
+            'queued': self.queued,
+            'batch_size': self.batch_sizes.as_dict(),
+            'queue_wait_seconds': self.queue_wait.as_dict(),
+        }
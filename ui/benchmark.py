@@ -0,0 +1,172 @@
+"""Model bake-off: accuracy next to latency, throughput, size, load time and memory"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from train import load_training_data
+
+BATCH_SIZES = [1, 16, 256, 4096]
+
+# Run in a fresh interpreter so load time includes importing the model's library
+LOAD_PROBE = r"""
+import json, pickle, sys, time
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+import numpy
+before = rss_kb()
+t = time.perf_counter()
+with open(sys.argv[1], 'rb') as f:
+    pickle.load(f)
+print(json.dumps({'load_seconds': time.perf_counter() - t, 'rss_before_kb': before, 'rss_after_kb': rss_kb()}))
+"""
+
+
+def candidates(seed, quick=False):
+    """name -> unfitted estimator; optional libraries are skipped if missing"""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.svm import SVC
+    from sklearn.tree import DecisionTreeClassifier
+
+    n = 20 if quick else 100
+    models = {
+        'gradient_boosting': GradientBoostingClassifier(n_estimators=n, random_state=seed),
+        'random_forest': RandomForestClassifier(n_estimators=n, random_state=seed),
+        'svm': SVC(kernel='linear', probability=False, random_state=seed),
+        'decision_tree': DecisionTreeClassifier(random_state=seed),
+        'neural_network': MLPClassifier(hidden_layer_sizes=(64,), max_iter=100 if quick else 300, random_state=seed),
+    }
+    try:
+        from xgboost import XGBClassifier
+        models['xgboost'] = XGBClassifier(n_estimators=n, random_state=seed, n_jobs=1)
+    except ImportError:
+        print("xgboost not installed, skipping")
+    return models
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1e3)
+
+
+def single_row_latency(model, X, repeats):
+    """Wall time of predict() on one row at a time"""
+    times = []
+    rows = [X[i:i + 1] for i in range(min(len(X), repeats))]
+    model.predict(rows[0])  # warm up
+    for i in range(repeats):
+        row = rows[i % len(rows)]
+        t = time.perf_counter()
+        model.predict(row)
+        times.append(time.perf_counter() - t)
+    return times
+
+
+def batch_throughput(model, X, batch_size, min_seconds=0.5):
+    """Rows per second when predicting fixed-size batches"""
+    reps = int(np.ceil(batch_size / len(X)))
+    batch = np.ascontiguousarray(np.tile(X, (reps, 1))[:batch_size])
+    model.predict(batch)
+    n, t0 = 0, time.perf_counter()
+    while True:
+        model.predict(batch)
+        n += batch_size
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_seconds:
+            return n / elapsed
+
+
+def load_probe(path):
+    out = subprocess.run([sys.executable, '-c', LOAD_PROBE, path], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench_model(name, model, X_train, y_train, X_test, y_test, repeats, workdir):
+    t = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - t
+    accuracy = float(np.mean(model.predict(X_test) == y_test))
+
+    latency = single_row_latency(model, X_test, repeats)
+    throughput = {str(b): batch_throughput(model, X_test, b) for b in BATCH_SIZES}
+
+    path = os.path.join(workdir, f"{name}.pkl")
+    with open(path, 'wb') as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    probe = load_probe(path)
+
+    return {
+        'accuracy': accuracy,
+        'fit_seconds': fit_seconds,
+        'latency_p50_ms': percentile_ms(latency, 50),
+        'latency_p99_ms': percentile_ms(latency, 99),
+        'throughput_rows_per_s': throughput,
+        'size_bytes': os.path.getsize(path),
+        'load_seconds': probe['load_seconds'],
+        'rss_after_load_mb': probe['rss_after_kb'] / 1024,
+        'rss_delta_mb': (probe['rss_after_kb'] - probe['rss_before_kb']) / 1024,
+    }
+
+
+def print_table(results):
+    print(f"{'model':<18}{'acc':>8}{'p50 ms':>9}{'p99 ms':>9}{'rows/s@4096':>13}{'size KB':>10}{'load ms':>9}{'rss MB':>8}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['accuracy']:>8.4f}{r['latency_p50_ms']:>9.3f}{r['latency_p99_ms']:>9.3f}"
+              f"{r['throughput_rows_per_s']['4096']:>13.0f}{r['size_bytes'] / 1024:>10.0f}"
+              f"{r['load_seconds'] * 1e3:>9.0f}{r['rss_delta_mb']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark candidate models on symtoms_df.csv")
+    parser.add_argument('--models', nargs='*', help="subset of candidates to run")
+    parser.add_argument('--output', default='benchmark.json', help="JSON report path")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--repeats', type=int, default=300, help="single-row latency samples")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--quick', action='store_true', help="smaller models for a fast smoke run")
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+
+    X, y = load_training_data()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, stratify=y, random_state=args.seed)
+
+    models = candidates(args.seed, args.quick)
+    if args.models:
+        models = {k: v for k, v in models.items() if k in args.models}
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, model in models.items():
+            print(f"Benchmarking {name}...", flush=True)
+            results[name] = bench_model(name, model, X_train, y_train, X_test, y_test, args.repeats, workdir)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python_version': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'n_train': int(len(X_train)),
+        'n_test': int(len(X_test)),
+        'batch_sizes': BATCH_SIZES,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_table(results)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Confidence-gated cascade: the co-occurrence scorer first, the full model when unsure"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+# Top-1 minus top-2 probability the cheap stage needs to answer on its own
+CASCADE_MARGIN = 0.999
+
+STAGES = ('cheap', 'full')
+
+
+def top_margin(proba):
+    """Gap between the two most likely classes of every row"""
+    if proba.shape[1] < 2:
+        return np.ones(len(proba))
+    top2 = np.partition(proba, -2, axis=1)[:, -2:]
+    return top2[:, 1] - top2[:, 0]
+
+
+class CascadePredictor:
+    """Answers from ``cheap`` when its margin clears ``margin``, else from ``full``.
+
+    Both models must share the column layout and class labels. Has the same
+    ``predict`` interface as the models it wraps, and counts per stage how
+    many rows it answered and the time spent.
+    """
+
+    def __init__(self, cheap, full, margin=CASCADE_MARGIN):
+        self.cheap = cheap
+        self.full = full
+        self.margin = margin
+        self.classes_ = full.classes_
+        self.n_features_in_ = full.n_features_in_
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.rows = {stage: 0 for stage in STAGES}
+            self.seconds = {stage: 0.0 for stage in STAGES}
+
+    def cheap_proba(self, X):
+        """Cheap-stage probabilities, and the rows it is sure enough to answer alone"""
+        proba = self.cheap.predict_proba(X)
+        return proba, top_margin(proba) >= self.margin
+
+    def predict(self, X):
+        t0 = time.perf_counter()
+        proba, sure = self.cheap_proba(X)
+        labels = self.cheap.classes_[np.argmax(proba, axis=1)]
+        unsure = ~sure
+        t1 = time.perf_counter()
+        n_unsure = int(np.count_nonzero(unsure))
+        if n_unsure:
+            labels = labels.astype(self.classes_.dtype, copy=True)
+            labels[unsure] = self.full.predict(np.asarray(X)[unsure])
+        t2 = time.perf_counter()
+
+        with self._lock:
+            self.calls += 1
+            self.rows['cheap'] += len(labels) - n_unsure
+            self.rows['full'] += n_unsure
+            self.seconds['cheap'] += t1 - t0
+            self.seconds['full'] += t2 - t1
+        return labels
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.rows.values())
+            return {
+                'margin': self.margin,
+                'calls': self.calls,
+                'rows': dict(self.rows),
+                'cheap_rate': self.rows['cheap'] / total if total else 0.0,
+                'seconds': dict(self.seconds),
+            }
+
+
+def drop_one(X):
+    """Every row with one of its symptoms removed, mimicking partial input"""
+    rows = []
+    for x in X:
+        for j in np.flatnonzero(x):
+            if np.count_nonzero(x) > 1:
+                variant = x.copy()
+                variant[j] = 0
+                rows.append(variant)
+    return np.array(rows, dtype=X.dtype).reshape(-1, X.shape[1])
+
+
+def per_row_seconds(predict, X, limit=2000):
+    rows = [X[i:i + 1] for i in range(min(len(X), limit))]
+    t = time.perf_counter()
+    for row in rows:
+        predict(row)
+    return (time.perf_counter() - t) / len(rows)
+
+
+def report(cheap, full, X, y, margins):
+    """How often the cheap stage answers at each margin, and what it costs"""
+    full_labels = full.predict(X)
+    full_latency = per_row_seconds(full.predict, X)
+    results = []
+    for margin in margins:
+        cascade = CascadePredictor(cheap, full, margin)
+        labels = cascade.predict(X)
+        stats = cascade.stats()
+        latency = per_row_seconds(cascade.predict, X)
+        results.append({
+            'margin': margin,
+            'cheap_rate': stats['cheap_rate'],
+            'agreement': float(np.mean(labels == full_labels)),
+            'accuracy': float(np.mean(labels == y)) if y is not None else None,
+            'latency_us': latency * 1e6,
+            'speedup': full_latency / latency,
+        })
+    return full_latency, float(np.mean(full_labels == y)) if y is not None else None, results
+
+
+def differential_mismatches(engine, X):
+    """Rows of ``X`` whose differential does not start with their diagnosis"""
+    names = np.array(list(engine.symptoms_dict))
+    bad = []
+    for x in X:
+        symptoms = list(names[np.flatnonzero(x)])
+        diagnosis = engine.predict(symptoms)
+        top = engine.predict_top(symptoms, 1)[0][0]
+        if top != diagnosis:
+            bad.append((symptoms, diagnosis, top))
+    return bad
+
+
+def main():
+    from engine import DiagnosisEngine
+    from knowledge import KnowledgeBase
+    from train import load_training_data
+
+    parser = argparse.ArgumentParser(description="Report how the cascade behaves on symtoms_df.csv")
+    parser.add_argument('--margin', type=float, nargs='*', default=[0.5, 0.9, 0.99, 0.999, 0.9999])
+    parser.add_argument('--partial', action='store_true',
+                        help="also score every record with one symptom removed")
+    parser.add_argument('--differential', action='store_true',
+                        help="check instead that predict_top's first entry is always the diagnosis")
+    args = parser.parse_args()
+
+    records = KnowledgeBase.load().symptom_rows
+    if args.differential:
+        X, _ = load_training_data()
+        X = np.unique(np.vstack([X, drop_one(X)]), axis=0)
+        engine = DiagnosisEngine()
+        engine.set_training_records(records)
+        engine.load_model()
+        bad = differential_mismatches(engine, X)
+        for symptoms, diagnosis, top in bad[:10]:
+            print(f"{', '.join(symptoms)}: diagnosis {diagnosis}, differential {top}")
+        print(f"{len(X) - len(bad)}/{len(X)} symptom sets agree")
+        raise SystemExit(1 if bad else 0)
+
+    engine = DiagnosisEngine(cascade_margin=None)
+    engine.set_training_records(records)
+    if not engine.load_model() or engine.using_fallback:
+        raise SystemExit("The full model could not be loaded")
+    cheap, full = engine.fallback_for(engine.encoder), engine.primary
+
+    X, y = load_training_data()
+    datasets = [("symtoms_df.csv", X, y)]
+    if args.partial:
+        datasets.append(("one symptom removed", drop_one(X), None))
+
+    for name, data, labels in datasets:
+        full_latency, full_accuracy, results = report(cheap, full, data, labels, args.margin)
+        accuracy = f", accuracy {full_accuracy:.4f}" if full_accuracy is not None else ""
+        print(f"{name}: {len(data)} rows, full model {full_latency * 1e6:.0f} us/row{accuracy}")
+        print(f"{'margin':>8}{'cheap %':>9}{'agree %':>9}{'acc %':>8}{'us/row':>8}{'speedup':>9}")
+        for r in results:
+            acc = f"{r['accuracy'] * 100:>8.2f}" if r['accuracy'] is not None else f"{'-':>8}"
+            print(f"{r['margin']:>8.4g}{r['cheap_rate'] * 100:>9.1f}{r['agreement'] * 100:>9.2f}{acc}"
+                  f"{r['latency_us']:>8.0f}{r['speedup']:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Disease x symptom co-occurrence scorer used when model.pkl is unavailable"""
+import numpy as np
+
+
+class CooccurrenceModel:
+    """Bernoulli naive Bayes over the symtoms_df.csv records.
+
+    Every disease gets a weight per symptom, ``log p - log(1 - p)``, and a bias
+    holding its prior plus the cost of all symptoms being absent, so scoring a
+    patient is one product of the one-hot row with the symptom x disease
+    weight matrix. Exposes the same ``predict`` / ``predict_proba`` interface
+    as the gradient-boosting model so the engine can swap it in.
+    """
+
+    def __init__(self, weights, bias, classes):
+        self.weights = weights  # n_features x n_classes
+        self.bias = bias
+        self.classes_ = classes
+        self.n_features_in_ = weights.shape[0]
+
+    @classmethod
+    def fit(cls, records, n_features, alpha=1.0):
+        """Build from ``(label, symptom column indices, count)`` records"""
+        classes = np.array(sorted({label for label, _, _ in records}))
+        column = {label: k for k, label in enumerate(classes)}
+        present = np.zeros((n_features, len(classes)))
+        totals = np.zeros(len(classes))
+        for label, indices, count in records:
+            k = column[label]
+            present[indices, k] += count
+            totals[k] += count
+
+        # Laplace-smoothed P(symptom present | disease)
+        p = (present + alpha) / (totals + 2 * alpha)
+        log_absent = np.log1p(-p)
+        weights = np.log(p) - log_absent
+        bias = np.log(totals / totals.sum()) + log_absent.sum(axis=0)
+        return cls(weights, bias, classes)
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        return X @ self.weights + self.bias
+
+    def predict_proba(self, X):
+        raw = self.decision_function(X)
+        proba = raw - raw.max(axis=1).reshape(-1, 1)
+        np.exp(proba, out=proba)
+        proba /= proba.sum(axis=1).reshape(-1, 1)
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.decision_function(X), axis=1)]
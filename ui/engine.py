@@ -0,0 +1,499 @@
+"""GUI-independent diagnosis engine shared by the desktop apps and headless callers"""
+import os
+import pickle
+import threading
+import time
+import numpy as np
+
+from cascade import CASCADE_MARGIN, CascadePredictor
+from cooccurrence import CooccurrenceModel
+from flat_model import FlatGradientBoosting, IncrementalScorer, source_stamp
+from metrics import REGISTRY
+from prediction_cache import PredictionCache
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_PATH, "..", "data")
+MODEL_PATH = os.path.join(BASE_PATH, "..", "model.pkl")
+# Flat NumPy export of model.pkl; preferred when present and not older, as it
+# loads and predicts without importing scikit-learn
+FLAT_MODEL_PATH = os.path.join(BASE_PATH, "..", "model.npz")
+
+# How often (seconds) predictions re-stat model.pkl to pick up a retrained model
+MODEL_CHECK_INTERVAL = 1.0
+
+# 'full' serves the trained model and falls back to the co-occurrence scorer
+# only if it cannot be loaded; 'fast' always uses the co-occurrence scorer
+ENGINE_MODES = ('full', 'fast')
+ENGINE_MODE = os.environ.get('NEURALCARE_MODE', 'full')
+
+SYMPTOMS_DICT = {'itching': 0, 'skin_rash': 1, 'nodal_skin_eruptions': 2, 'continuous_sneezing': 3, 'shivering': 4, 'chills': 5, 'joint_pain': 6, 'stomach_pain': 7, 'acidity': 8, 'ulcers_on_tongue': 9, 'muscle_wasting': 10, 'vomiting': 11, 'burning_micturition': 12, 'spotting_ urination': 13, 'fatigue': 14, 'weight_gain': 15, 'anxiety': 16, 'cold_hands_and_feets': 17, 'mood_swings': 18, 'weight_loss': 19, 'restlessness': 20, 'lethargy': 21, 'patches_in_throat': 22, 'irregular_sugar_level': 23, 'cough': 24, 'high_fever': 25, 'sunken_eyes': 26, 'breathlessness': 27, 'sweating': 28, 'dehydration': 29, 'indigestion': 30, 'headache': 31, 'yellowish_skin': 32, 'dark_urine': 33, 'nausea': 34, 'loss_of_appetite': 35, 'pain_behind_the_eyes': 36, 'back_pain': 37, 'constipation': 38, 'abdominal_pain': 39, 'diarrhoea': 40, 'mild_fever': 41, 'yellow_urine': 42, 'yellowing_of_eyes': 43, 'acute_liver_failure': 44, 'fluid_overload': 45, 'swelling_of_stomach': 46, 'swelled_lymph_nodes': 47, 'malaise': 48, 'blurred_and_distorted_vision': 49, 'phlegm': 50, 'throat_irritation': 51, 'redness_of_eyes': 52, 'sinus_pressure': 53, 'runny_nose': 54, 'congestion': 55, 'chest_pain': 56, 'weakness_in_limbs': 57, 'fast_heart_rate': 58, 'pain_during_bowel_movements': 59, 'pain_in_anal_region': 60, 'bloody_stool': 61, 'irritation_in_anus': 62, 'neck_pain': 63, 'dizziness': 64, 'cramps': 65, 'bruising': 66, 'obesity': 67, 'swollen_legs': 68, 'swollen_blood_vessels': 69, 'puffy_face_and_eyes': 70, 'enlarged_thyroid': 71, 'brittle_nails': 72, 'swollen_extremeties': 73, 'excessive_hunger': 74, 'extra_marital_contacts': 75, 'drying_and_tingling_lips': 76, 'slurred_speech': 77, 'knee_pain': 78, 'hip_joint_pain': 79, 'muscle_weakness': 80, 'stiff_neck': 81, 'swelling_joints': 82, 'movement_stiffness': 83, 'spinning_movements': 84, 'loss_of_balance': 85, 'unsteadiness': 86, 'weakness_of_one_body_side': 87, 'loss_of_smell': 88, 'bladder_discomfort': 89, 'foul_smell_of urine': 90, 'continuous_feel_of_urine': 91, 'passage_of_gases': 92, 'internal_itching': 93, 'toxic_look_(typhos)': 94, 'depression': 95, 'irritability': 96, 'muscle_pain': 97, 'altered_sensorium': 98, 'red_spots_over_body': 99, 'belly_pain': 100, 'abnormal_menstruation': 101, 'dischromic _patches': 102, 'watering_from_eyes': 103, 'increased_appetite': 104, 'polyuria': 105, 'family_history': 106, 'mucoid_sputum': 107, 'rusty_sputum': 108, 'lack_of_concentration': 109, 'visual_disturbances': 110, 'receiving_blood_transfusion': 111, 'receiving_unsterile_injections': 112, 'coma': 113, 'stomach_bleeding': 114, 'distention_of_abdomen': 115, 'history_of_alcohol_consumption': 116, 'fluid_overload.1': 117, 'blood_in_sputum': 118, 'prominent_veins_on_calf': 119, 'palpitations': 120, 'painful_walking': 121, 'pus_filled_pimples': 122, 'blackheads': 123, 'scurring': 124, 'skin_peeling': 125, 'silver_like_dusting': 126, 'small_dents_in_nails': 127, 'inflammatory_nails': 128, 'blister': 129, 'red_sore_around_nose': 130, 'yellow_crust_ooze': 131}
+DISEASES_LIST = {15: 'Fungal infection', 4: 'Allergy', 16: 'GERD', 9: 'Chronic cholestasis', 14: 'Drug Reaction', 33: 'Peptic ulcer diseae', 1: 'AIDS', 12: 'Diabetes ', 17: 'Gastroenteritis', 6: 'Bronchial Asthma', 23: 'Hypertension ', 30: 'Migraine', 7: 'Cervical spondylosis', 32: 'Paralysis (brain hemorrhage)', 28: 'Jaundice', 29: 'Malaria', 8: 'Chicken pox', 11: 'Dengue', 37: 'Typhoid', 40: 'hepatitis A', 19: 'Hepatitis B', 20: 'Hepatitis C', 21: 'Hepatitis D', 22: 'Hepatitis E', 3: 'Alcoholic hepatitis', 36: 'Tuberculosis', 10: 'Common Cold', 34: 'Pneumonia', 13: 'Dimorphic hemmorhoids(piles)', 18: 'Heart attack', 39: 'Varicose veins', 26: 'Hypothyroidism', 24: 'Hyperthyroidism', 25: 'Hypoglycemia', 31: 'Osteoarthristis', 5: 'Arthritis', 0: '(vertigo) Paroymsal  Positional Vertigo', 2: 'Acne', 38: 'Urinary tract infection', 35: 'Psoriasis', 27: 'Impetigo'}
+
+
+class SymptomEncoder:
+    """Precompiled symptom -> column map feeding the model float32 rows.
+
+    The vocabulary is resolved to integer columns once. Single predictions
+    reuse one preallocated 1 x n row, so no per-call DataFrame or column
+    list is ever built.
+    """
+
+    def __init__(self, symptoms_dict, feature_names=None):
+        if feature_names is None:
+            self.index = dict(symptoms_dict)
+        else:
+            # Checked once at load time; the model's column order wins
+            feature_names = [str(f) for f in feature_names]
+            if sorted(feature_names) != sorted(symptoms_dict):
+                missing = set(symptoms_dict) ^ set(feature_names)
+                raise ValueError(f"Model features do not match the symptom vocabulary: {sorted(missing)[:5]}")
+            self.index = {name: i for i, name in enumerate(feature_names)}
+        self.n_features = len(self.index)
+        # symptoms_dict column feeding each model column, None when they match
+        order = [symptoms_dict[name] for name in sorted(self.index, key=self.index.get)]
+        self.order = None if order == sorted(order) else np.array(order, dtype=np.intp)
+        self.row = np.zeros((1, self.n_features), dtype=np.float32)
+        self._last = np.empty(0, dtype=np.intp)
+
+    def indices(self, symptoms):
+        """Column indices for the known symptoms in ``symptoms``"""
+        index = self.index
+        return np.fromiter((index[s] for s in symptoms if s in index), dtype=np.intp)
+
+    @staticmethod
+    def bitmask(indices):
+        """Integer with bit i set for every column i, used as a cache key"""
+        key = 0
+        for i in indices:
+            key |= 1 << int(i)
+        return key
+
+    def fill(self, indices):
+        """Fill and return the shared 1 x n buffer; valid until the next call"""
+        self.row[0, self._last] = 0
+        self._last = indices
+        self.row[0, indices] = 1
+        return self.row
+
+    def encode_indices(self, index_lists):
+        """Build a fresh N x n matrix from per-patient column index arrays"""
+        X = np.zeros((len(index_lists), self.n_features), dtype=np.float32)
+        for i, idx in enumerate(index_lists):
+            X[i, idx] = 1
+        return X
+
+    def encode(self, patients):
+        """One-hot encode a list of symptom lists into a fresh N x n matrix"""
+        index = self.index
+        rows, cols = [], []
+        for i, symptoms in enumerate(patients):
+            for s in symptoms:
+                j = index.get(s)
+                if j is not None:
+                    rows.append(i)
+                    cols.append(j)
+        X = np.zeros((len(patients), self.n_features), dtype=np.float32)
+        X[rows, cols] = 1
+        return X
+
+
+class DiagnosisEngine:
+    """Scores patients' symptom lists against the trained model.
+
+    Many patients are encoded into one N x 132 matrix and evaluated with a
+    single vectorized ``model.predict`` call. Symptom sets known from the
+    training records are answered from a precomputed table (the fast path);
+    anything else is memoized in an LRU keyed by symptom bitmask. Both are
+    rebuilt whenever model.pkl changes.
+
+    If the model cannot be loaded (or ``mode='fast'``) predictions come from a
+    co-occurrence scorer built from the training records passed to
+    ``set_training_records``; ``using_fallback`` tells which one is active.
+    With both available, misses go through a cascade that lets that scorer
+    answer when its margin clears ``cascade_margin`` (None disables it).
+    """
+
+    def __init__(self, model_path=MODEL_PATH, cache_size=4096, flat_model_path=FLAT_MODEL_PATH,
+                 mode=ENGINE_MODE, cascade_margin=CASCADE_MARGIN):
+        if mode not in ENGINE_MODES:
+            raise ValueError(f"Unknown engine mode {mode!r}, expected one of {ENGINE_MODES}")
+        self.mode = mode
+        self.model_path = model_path
+        self.flat_model_path = flat_model_path
+        self.symptoms_dict = SYMPTOMS_DICT
+        self.diseases_list = DISEASES_LIST
+        self.encoder = SymptomEncoder(self.symptoms_dict)
+        self.model = None  # what predictions are served from
+        self.primary = None  # the trained model, when loaded
+        self.cascade = None
+        self.cascade_margin = cascade_margin
+        self.live = None  # IncrementalScorer behind predict_top, flat model only
+        self.model_loaded = False
+        self.model_stamp = None
+        self.model_source_path = None
+        self.fallback = None
+        self.fallback_encoder = None
+        self.using_fallback = False
+        self.cache = PredictionCache(cache_size)
+        self.known_sets = []
+        self.fast_path = {}  # bitmask -> disease, precomputed from known_sets
+        self.fast_lookups = 0
+        self.fast_hits = 0
+        self._row_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._next_check = 0.0
+
+    def _stat_model(self):
+        stamp = []
+        for path in (self.model_path, self.flat_model_path):
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except (OSError, TypeError):
+                stamp.append(None)
+        return tuple(stamp)
+
+    def model_source(self, stamp):
+        """The flat export if it was made from the current model.pkl, else model.pkl.
+
+        The export records the size and sha1 of its pickle. File times cannot
+        decide this, since a checkout writes the two files in any order.
+        """
+        pkl, flat = stamp
+        if flat is None:
+            return self.model_path
+        if pkl is None:
+            return self.flat_model_path
+        try:
+            recorded = FlatGradientBoosting.read_source(self.flat_model_path)
+            # Sizes first, so a mismatch costs no hashing
+            if recorded is not None and recorded[0] == pkl[1] and recorded == source_stamp(self.model_path):
+                return self.flat_model_path
+        except Exception as e:
+            print(f"Error reading flat model {self.flat_model_path}: {e}")
+            return self.model_path
+        print(f"{self.flat_model_path} was not exported from {self.model_path}; "
+              f"re-export it with flat_model.py")
+        return self.model_path
+
+    def _read_model(self, source):
+        if source == self.flat_model_path:
+            return FlatGradientBoosting.load(source)
+        with open(source, 'rb') as f:
+            return pickle.load(f)
+
+    def load_model(self):
+        """Load the flat export or unpickle the model.
+
+        Returns True if predictions can be served, possibly by the fallback.
+        """
+        if self.mode == 'fast':
+            return self.use_fallback()
+        stamp = self._stat_model()
+        source = self.model_source(stamp)
+        try:
+            try:
+                model = self._read_model(source)
+            except Exception as e:
+                if source == self.model_path:
+                    raise
+                print(f"Error loading flat model {source}: {e}; falling back to {self.model_path}")
+                source = self.model_path
+                model = self._read_model(source)
+            encoder = SymptomEncoder(self.symptoms_dict, getattr(model, 'feature_names_in_', None))
+            # Names are validated above, so plain arrays can be fed from now on
+            # without sklearn warning about missing feature names
+            try:
+                del model.feature_names_in_
+            except AttributeError:
+                pass
+        except Exception as e:
+            print(f"Error loading model from {source}: {e}")
+            # Retry only once the file changes again
+            self.model_stamp = stamp
+            self._next_check = time.monotonic() + MODEL_CHECK_INTERVAL
+            if not self.model_loaded:
+                return self.use_fallback()
+            return True
+        serving = self._serving_model(model, encoder)
+        live = IncrementalScorer(model) if isinstance(model, FlatGradientBoosting) else None
+        with self._row_lock:
+            self.primary, self.model, self.encoder = model, serving, encoder
+            self.live = live
+            self.cascade = serving if serving is not model else None
+            self.model_stamp = stamp
+            self.model_source_path = source
+            self.model_loaded = True
+            self.using_fallback = False
+            self.cache.invalidate()
+        self._next_check = time.monotonic() + MODEL_CHECK_INTERVAL
+        self.build_fast_path()
+        return True
+
+    def use_fallback(self):
+        """Serve predictions from the co-occurrence scorer, True if it is built"""
+        with self._row_lock:
+            self.using_fallback = True
+            self.model_source_path = None
+            if self.fallback is None:
+                self.model = None
+                self.model_loaded = False
+                return False
+            self.model, self.encoder = self.fallback, self.fallback_encoder
+            self.cascade = None
+            self.live = None
+            self.model_loaded = True
+            self.cache.invalidate()
+        self.build_fast_path()
+        return True
+
+    def set_training_records(self, records):
+        """Build the fallback scorer and fast path from knowledge.symptom_rows.
+
+        ``records`` are ``(disease, symptom tuple, count)`` triples as read
+        from symtoms_df.csv.
+        """
+        from knowledge import normalize
+
+        label_of = {normalize(name): label for label, name in self.diseases_list.items()}
+        encoder = SymptomEncoder(self.symptoms_dict)
+        rows = [(label_of[normalize(disease)], encoder.indices(symptoms), count)
+                for disease, symptoms, count in records
+                if normalize(disease) in label_of]
+        if rows:
+            self.fallback = CooccurrenceModel.fit(rows, encoder.n_features)
+            self.fallback_encoder = encoder
+        self.known_sets = list(dict.fromkeys(tuple(symptoms) for _, symptoms, _ in records))
+        if self.using_fallback:
+            self.use_fallback()
+            return
+        if self.primary is not None:
+            with self._row_lock:
+                self.model = self._serving_model(self.primary, self.encoder)
+                self.cascade = self.model if self.model is not self.primary else None
+                self.cache.invalidate()
+        self.build_fast_path()
+
+    def fallback_for(self, encoder):
+        """The fallback scorer laid out in ``encoder``'s column order"""
+        if self.fallback is None or encoder.index == self.fallback_encoder.index:
+            return self.fallback
+        order = [self.fallback_encoder.index[name] for name in sorted(encoder.index, key=encoder.index.get)]
+        return CooccurrenceModel(self.fallback.weights[order], self.fallback.bias, self.fallback.classes_)
+
+    def _serving_model(self, model, encoder):
+        cheap = self.fallback_for(encoder)
+        if self.cascade_margin is None or cheap is None:
+            return model
+        return CascadePredictor(cheap, model, self.cascade_margin)
+
+    def _scoring_model(self):
+        """The model to use bypassing the cascade, with its encoder"""
+        return (self.model if self.using_fallback else self.primary), self.encoder
+
+    def cascade_stats(self):
+        """Rows answered per cascade stage, or None when no cascade is active"""
+        cascade = self.cascade
+        return cascade.stats() if cascade is not None else None
+
+    def build_fast_path(self):
+        """Score every known symptom set once, in a single batch"""
+        if not self.model_loaded or not self.known_sets:
+            self.fast_path = {}
+            return
+        with self._row_lock:
+            # Known sets are scored once, so they always get the trained model
+            model, encoder = self._scoring_model()
+        index_lists = [encoder.indices(s) for s in self.known_sets]
+        labels = model.predict(encoder.encode_indices(index_lists))
+        self.fast_path = {encoder.bitmask(idx): self.diseases_list.get(label, "Unknown")
+                          for idx, label in zip(index_lists, labels)}
+
+    def _lookup_fast(self, key):
+        res = self.fast_path.get(key)
+        with self._stats_lock:
+            self.fast_lookups += 1
+            if res is not None:
+                self.fast_hits += 1
+        return res
+
+    def metrics(self):
+        """Cumulative counters for a metrics collector"""
+        fast = self.fast_path_stats()
+        cache = self.cache.stats()
+        counters = {
+            'fast_path_lookups': fast['lookups'],
+            'fast_path_hits': fast['hits'],
+            'cache_hits': cache['hits'],
+            'cache_misses': cache['misses'],
+            'cache_evictions': cache['evictions'],
+        }
+        cascade = self.cascade_stats()
+        if cascade is not None:
+            for stage, rows in cascade['rows'].items():
+                counters[f'cascade_rows{{stage="{stage}"}}'] = rows
+        live = self.live
+        if live is not None:
+            # trees_walked / updates against len(live.flat.roots) shows how little each toggle re-scores
+            counters['differential_updates'] = live.updates
+            counters['differential_trees_walked'] = live.trees_walked
+        return counters
+
+    def fast_path_stats(self):
+        with self._stats_lock:
+            return {
+                'entries': len(self.fast_path),
+                'lookups': self.fast_lookups,
+                'hits': self.fast_hits,
+                'hit_rate': self.fast_hits / self.fast_lookups if self.fast_lookups else 0.0,
+            }
+
+    def refresh_model(self):
+        """Reload model.pkl if it changed on disk (checked at most once per interval)"""
+        now = time.monotonic()
+        if self.mode == 'fast' or now < self._next_check:
+            return
+        # One thread checks and reloads; the others keep serving the current model
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if now < self._next_check:
+                return
+            self._next_check = now + MODEL_CHECK_INTERVAL
+            try:
+                stamp = self._stat_model()
+            except OSError:
+                return
+            if stamp != self.model_stamp:
+                self.load_model()
+        finally:
+            self._refresh_lock.release()
+
+    def _check_ready(self):
+        if not self.model_loaded:
+            raise RuntimeError("The AI model is not loaded.")
+        self.refresh_model()
+
+    def predict_batch(self, patients):
+        """Return one disease name per patient from a single model call"""
+        self._check_ready()
+        if not patients:
+            return []
+        t0 = time.perf_counter()
+        with self._row_lock:
+            model, encoder = self.model, self.encoder
+        generation = self.cache.generation
+
+        results = [None] * len(patients)
+        misses = {}  # bitmask -> (indices, [positions])
+        for pos, symptoms in enumerate(patients):
+            idx = encoder.indices(symptoms)
+            key = encoder.bitmask(idx)
+            res = self._lookup_fast(key)
+            if res is None:
+                res = self.cache.get(key)
+            if res is None:
+                misses.setdefault(key, (idx, []))[1].append(pos)
+            else:
+                results[pos] = res
+        t1 = time.perf_counter()
+        REGISTRY.observe('batch_lookup', t1 - t0)
+
+        if misses:
+            keys = list(misses)
+            labels = model.predict(encoder.encode_indices([misses[k][0] for k in keys]))
+            REGISTRY.observe('model', time.perf_counter() - t1)
+            for key, label in zip(keys, labels):
+                res = self.diseases_list.get(label, "Unknown")
+                self.cache.put(key, res, generation)
+                for pos in misses[key][1]:
+                    results[pos] = res
+        REGISTRY.inc('predictions', len(patients))
+        return results
+
+    def predict(self, symptoms):
+        """Predict the disease for a single patient"""
+        self._check_ready()
+        REGISTRY.inc('predictions')
+        t0 = time.perf_counter()
+        encoder = self.encoder
+        idx = encoder.indices(symptoms)
+        key = encoder.bitmask(idx)
+        t1 = time.perf_counter()
+        res = self._lookup_fast(key)
+        if res is None:
+            res = self.cache.get(key)
+        t2 = time.perf_counter()
+        REGISTRY.observe('encode', t1 - t0)
+        REGISTRY.observe('lookup', t2 - t1)
+        if res is not None:
+            return res
+        with self._row_lock:
+            if self.encoder is not encoder:  # model reloaded meanwhile
+                idx = self.encoder.indices(symptoms)
+            generation = self.cache.generation
+            label = self.model.predict(self.encoder.fill(idx))[0]
+        REGISTRY.observe('model', time.perf_counter() - t2)
+        res = self.diseases_list.get(label, "Unknown")
+        self.cache.put(key, res, generation)
+        return res
+
+    def predict_onehot(self, X):
+        """Disease names for N x 132 one-hot rows in ``symptoms_dict`` column order"""
+        return self.predict_packed(np.packbits(np.asarray(X) != 0, axis=1))
+
+    def predict_packed(self, packed):
+        """Disease names for rows bit-packed with ``np.packbits(X, axis=1)``.
+
+        Meant for large offline batches: duplicate rows, common in real
+        intake data, are found by comparing the 17-byte packed rows, and only
+        the distinct ones are unpacked and scored, all in one model call.
+        """
+        self._check_ready()
+        if not len(packed):
+            return []
+        with self._row_lock:
+            model, encoder = self.model, self.encoder
+        packed = np.ascontiguousarray(packed, dtype=np.uint8)
+        keys = packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        distinct = np.unpackbits(packed[first], axis=1, count=encoder.n_features)
+        if encoder.order is not None:
+            distinct = distinct[:, encoder.order]
+        t = time.perf_counter()
+        labels = model.predict(distinct.astype(np.float32))
+        REGISTRY.observe('model', time.perf_counter() - t)
+        REGISTRY.inc('predictions', len(packed))
+        names = [self.diseases_list.get(label, "Unknown") for label in labels]
+        return [names[i] for i in inverse.ravel()]
+
+    def predict_top(self, symptoms, k=5):
+        """The ``k`` most likely diseases as ``(name, probability)``, best first.
+
+        Probabilities come from the stage ``predict`` answers with (the
+        cascade's cheap stage when it is sure and the set is not on the fast
+        path), so the first entry is always the diagnosis. Successive calls
+        usually differ by one symptom, so with the flat model only the trees
+        splitting on the changed symptoms are re-walked.
+        """
+        self._check_ready()
+        t = time.perf_counter()
+        with self._row_lock:
+            model, encoder = self._scoring_model()
+            idx = encoder.indices(symptoms)
+            proba = None
+            cascade = self.cascade
+            if cascade is not None and encoder.bitmask(idx) not in self.fast_path:
+                cheap, sure = cascade.cheap_proba(encoder.fill(idx))
+                if sure[0]:
+                    model, proba = cascade.cheap, cheap[0]
+            if proba is None:
+                if self.live is not None:
+                    self.live.set_indices(idx)
+                    proba = self.live.predict_proba()[0]
+                else:
+                    proba = model.predict_proba(encoder.fill(idx))[0]
+        order = np.argsort(-proba, kind='stable')[:k]
+        REGISTRY.observe('differential', time.perf_counter() - t)
+        return [(self.diseases_list.get(model.classes_[i], "Unknown"), float(proba[i])) for i in order]
@@ -0,0 +1,202 @@
+"""On-disk, bit-packed and memory-mapped symptom matrix for datasets larger than RAM"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Imported first so that, when profiling is on, the imports below are timed
+import profiling
+import numpy as np
+
+from engine import DISEASES_LIST, SYMPTOMS_DICT
+
+# Rows unpacked into one model-ready float32 batch
+CHUNK_ROWS = 65536
+
+# Bump whenever the on-disk layout changes
+STORE_VERSION = 1
+
+BITS_FILE = "bits.u8"
+LABELS_FILE = "labels.i32"
+META_FILE = "meta.json"
+
+
+class FeatureStore:
+    """Read-only view of a feature store directory.
+
+    ``bits.u8`` holds one ``np.packbits`` row per patient (17 bytes for 132
+    symptoms, against 528 as float32), ``labels.i32`` the optional integer
+    labels and ``meta.json`` the row count and column names. Both files are
+    memory-mapped, so opening a store reads nothing and slicing ``packed``
+    or ``labels`` is zero-copy; pages are read from disk as they are used.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"{path} is feature store version {meta.get('version')}, expected {STORE_VERSION}")
+        self.path = path
+        self.columns = meta['columns']
+        self.n_features = len(self.columns)
+        self.rows = meta['rows']
+        self.row_bytes = (self.n_features + 7) // 8
+        self.packed = self._map(BITS_FILE, np.uint8, (self.rows, self.row_bytes))
+        self.labels = self._map(LABELS_FILE, np.int32, (self.rows,)) if meta['labels'] else None
+
+    def _map(self, name, dtype, shape):
+        if not self.rows:  # mmap cannot map an empty file
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r', shape=shape)
+
+    def __len__(self):
+        return self.rows
+
+    def unpack(self, start, stop, dtype=np.float32, out=None):
+        """Rows ``start:stop`` as a dense 0/1 matrix, written into ``out`` if given"""
+        bits = np.unpackbits(self.packed[start:stop], axis=1, count=self.n_features)
+        if out is None:
+            return bits.astype(dtype)
+        np.copyto(out, bits, casting='unsafe')
+        return out
+
+    def batches(self, rows=CHUNK_ROWS, dtype=np.float32):
+        """Yield ``(start, X, y)`` for consecutive dense batches of up to ``rows`` rows"""
+        for start in range(0, self.rows, rows):
+            stop = min(start + rows, self.rows)
+            y = None if self.labels is None else np.asarray(self.labels[start:stop])
+            yield start, self.unpack(start, stop, dtype), y
+
+    def to_dense(self, dtype=np.float32, rows=CHUNK_ROWS):
+        """The whole matrix, unpacked chunk by chunk straight into one allocation"""
+        X = np.empty((self.rows, self.n_features), dtype=dtype)
+        for start in range(0, self.rows, rows):
+            stop = min(start + rows, self.rows)
+            self.unpack(start, stop, out=X[start:stop])
+        return X
+
+
+class FeatureStoreWriter:
+    """Appends rows to a new feature store; ``meta.json`` is written on close.
+
+    A directory without ``meta.json`` is an unfinished store and cannot be
+    opened, so an interrupted build is never mistaken for a complete one.
+    """
+
+    def __init__(self, path, columns=tuple(SYMPTOMS_DICT), labels=False):
+        os.makedirs(path, exist_ok=True)
+        try:
+            os.remove(os.path.join(path, META_FILE))
+        except FileNotFoundError:
+            pass
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+        self.bits = open(os.path.join(path, BITS_FILE), 'wb')
+        self.labels = open(os.path.join(path, LABELS_FILE), 'wb') if labels else None
+
+    def append(self, X, y=None):
+        """Append dense rows (any nonzero value is a present symptom)"""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != len(self.columns):
+            raise ValueError(f"Expected rows of {len(self.columns)} columns, got shape {X.shape}")
+        self.append_packed(np.packbits(X != 0, axis=1), y)
+
+    def append_packed(self, packed, y=None):
+        if (y is None) != (self.labels is None):
+            raise ValueError("Labels must be given for every chunk or for none")
+        if y is not None and len(y) != len(packed):
+            raise ValueError(f"{len(packed)} rows but {len(y)} labels")
+        self.bits.write(np.ascontiguousarray(packed, dtype=np.uint8).tobytes())
+        if y is not None:
+            self.labels.write(np.asarray(y, dtype=np.int32).tobytes())
+        self.rows += len(packed)
+
+    def close(self):
+        self.bits.close()
+        if self.labels is not None:
+            self.labels.close()
+        meta = {
+            'version': STORE_VERSION,
+            'rows': self.rows,
+            'columns': self.columns,
+            'labels': self.labels is not None,
+        }
+        tmp_path = os.path.join(self.path, f"{META_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.bits.close()
+            if self.labels is not None:
+                self.labels.close()
+
+
+@profiling.profile_calls('build')
+def build_from_csv(source, path, chunk_rows=CHUNK_ROWS, progress=None):
+    """Stream a patient CSV into a store at ``path``; returns the row count.
+
+    Takes the same layouts as score.py. A "Disease" column, as in
+    symtoms_df.csv, is stored as the DISEASES_LIST label.
+    """
+    import csv
+    import pandas as pd
+
+    from knowledge import normalize
+    from score import ChunkEncoder
+
+    header = next(csv.reader([source.readline().decode('utf-8-sig')]))
+    chunk_encoder = ChunkEncoder(header)
+    label_column = 'Disease' if 'Disease' in chunk_encoder.passthrough else None
+    label_of = {normalize(name): label for label, name in DISEASES_LIST.items()}
+    reader = pd.read_csv(source, chunksize=chunk_rows, header=None, names=header,
+                         dtype=chunk_encoder.dtypes(),
+                         usecols=chunk_encoder.symptom_columns + ([label_column] if label_column else []))
+
+    with FeatureStoreWriter(path, labels=label_column is not None) as writer:
+        for chunk in reader:
+            y = None
+            if label_column:
+                try:
+                    y = [label_of[normalize(d)] for d in chunk[label_column]]
+                except KeyError as e:
+                    raise ValueError(f"Disease {e} is not in DISEASES_LIST") from None
+            writer.append(chunk_encoder.encode(chunk), y)
+            if progress is not None:
+                progress(writer.rows)
+    return writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack a patient CSV into a memory-mapped feature store")
+    parser.add_argument('input', help="CSV with Symptom_* name columns or the 132 one-hot columns ('-' for stdin)")
+    parser.add_argument('output', help="feature store directory to write")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_ROWS)
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+
+    def progress(rows):
+        print(f"\r{rows} rows, {rows / (time.perf_counter() - t0):.0f} rows/s", end='', file=sys.stderr, flush=True)
+
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    with source:
+        rows = build_from_csv(source, args.output, args.chunk_size, progress)
+    print(file=sys.stderr)
+    store = FeatureStore(args.output)
+    size = os.path.getsize(os.path.join(args.output, BITS_FILE))
+    print(f"Wrote {rows} rows to {args.output} ({size / 1e6:.1f} MB packed, "
+          f"{'with' if store.labels is not None else 'no'} labels) in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
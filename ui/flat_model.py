@@ -0,0 +1,310 @@
+"""Flattened gradient-boosting ensemble evaluated with plain NumPy.
+
+``export_model`` turns a fitted sklearn GradientBoostingClassifier into flat
+node arrays saved as an .npz; ``FlatGradientBoosting`` loads and evaluates
+them without importing scikit-learn. Evaluation repeats sklearn's arithmetic
+exactly (float32 inputs against float64 thresholds, per-stage accumulation of
+``learning_rate * leaf_value``), so predictions are bit-for-bit identical.
+"""
+import argparse
+import hashlib
+import os
+
+import numpy as np
+
+# Rows evaluated at once; bounds the rows x trees node matrix
+CHUNK_ROWS = 512
+
+
+def source_stamp(path):
+    """(size, sha1) of the pickle an export is made from"""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return os.path.getsize(path), h.hexdigest()
+
+
+def export_model(model, path, source=None):
+    """Write the node arrays of a fitted GradientBoostingClassifier to ``path``.
+
+    ``source``, the pickle ``model`` was loaded from, is recorded by size and
+    sha1 so loaders can tell whether the export still matches it.
+    """
+    trees = model.estimators_
+    n_stages, n_outputs = trees.shape
+    n_features = model.n_features_in_
+
+    # The init estimator must give the same raw score for every row
+    probes = np.stack([np.zeros(n_features, np.float32), np.ones(n_features, np.float32)])
+    init = model._raw_predict_init(probes)
+    if not np.array_equal(init[0], init[1]):
+        raise ValueError("Only constant init estimators (the default prior or 'zero') can be exported")
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for i in range(n_stages):
+        for k in range(n_outputs):
+            tree = trees[i, k].tree_
+            n = tree.node_count
+            leaf = tree.children_left == -1
+            own = np.arange(n)
+            # Leaves point at themselves so every tree can be walked for max_depth steps
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append((np.where(leaf, own, tree.children_left) + offset).astype(np.int32))
+            rights.append((np.where(leaf, own, tree.children_right) + offset).astype(np.int32))
+            values.append(tree.value.reshape(n).astype(np.float64))
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+    feature_names = getattr(model, 'feature_names_in_', None)
+    size, sha1 = source_stamp(source) if source is not None else (-1, '')
+    np.savez(
+        path,
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        # Same double product sklearn computes per visit
+        value=model.learning_rate * np.concatenate(values),
+        roots=np.array(roots, dtype=np.int32),
+        shape=np.array([n_stages, n_outputs, n_features, max_depth], dtype=np.int64),
+        init=init[0].astype(np.float64),
+        classes=np.asarray(model.classes_),
+        loss=np.array(model.loss),
+        feature_names=np.array([] if feature_names is None else [str(f) for f in feature_names]),
+        source_size=np.array(size, dtype=np.int64),
+        source_sha1=np.array(sha1),
+    )
+
+
+class FlatGradientBoosting:
+    """sklearn-free evaluator for an exported GradientBoostingClassifier"""
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature'].astype(np.intp)
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = arrays['roots'].astype(np.intp)
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.empty(2 * len(self.feature), dtype=np.intp)
+        self.children[0::2] = arrays['left']
+        self.children[1::2] = arrays['right']
+        self.root_feature = self.feature[self.roots]
+        self.root_threshold = self.threshold[self.roots]
+        self.n_stages, self.n_outputs, self.n_features_in_, self.max_depth = (int(x) for x in arrays['shape'])
+        self.init = arrays['init']
+        self.classes_ = arrays['classes']
+        self.loss = str(arrays['loss'])
+        if len(arrays['feature_names']):
+            self.feature_names_in_ = arrays['feature_names'].astype(object)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({k: data[k] for k in data.files})
+
+    @staticmethod
+    def read_source(path):
+        """(size, sha1) of the pickle the export at ``path`` came from, None if unrecorded"""
+        with np.load(path, allow_pickle=False) as data:
+            if 'source_sha1' not in data.files or not str(data['source_sha1']):
+                return None
+            return int(data['source_size']), str(data['source_sha1'])
+
+    def apply(self, X):
+        """Leaf node index reached in every tree, shape (n_rows, n_trees)"""
+        # float32 -> float64 is exact and saves a cast on every comparison
+        X = np.asarray(X, dtype=np.float64)
+        # Every row starts at the roots, so the first split is a plain column take
+        go_right = ~(X[:, self.root_feature] <= self.root_threshold)
+        node = self.children[2 * self.roots + go_right]
+        flat = X.ravel()
+        offsets = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, None]
+        for _ in range(self.max_depth - 1):
+            go_right = ~(flat[offsets + self.feature[node]] <= self.threshold[node])
+            node = self.children[2 * node + go_right]
+        return node
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        out = np.empty((X.shape[0], self.n_outputs), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            contrib = self.value[self.apply(chunk)].reshape(len(chunk), self.n_stages, self.n_outputs)
+            out[start:start + CHUNK_ROWS] = self.accumulate(contrib)
+        return out
+
+    def accumulate(self, contrib):
+        """init + stage 1 + stage 2 + ..., summed strictly in stage order like sklearn.
+
+        Works in place on ``contrib`` (n_rows, n_stages, n_outputs).
+        """
+        contrib[:, 0] += self.init
+        np.cumsum(contrib, axis=1, out=contrib)
+        return contrib[:, -1]
+
+    def predict_proba(self, X):
+        return self.proba_from_raw(self.decision_function(X))
+
+    def proba_from_raw(self, raw):
+        if self.n_outputs == 1:
+            scale = 2.0 if self.loss == 'exponential' else 1.0
+            p = 1.0 / (1.0 + np.exp(-scale * raw[:, 0]))
+            return np.column_stack([1 - p, p])
+        # Same steps as sklearn.utils.extmath.softmax
+        proba = raw - raw.max(axis=1).reshape(-1, 1)
+        np.exp(proba, out=proba)
+        proba /= proba.sum(axis=1).reshape(-1, 1)
+        return proba
+
+    def predict(self, X):
+        raw = self.decision_function(X)
+        if self.n_outputs == 1:
+            return self.classes_[(raw[:, 0] >= 0).astype(int)]
+        return self.classes_[np.argmax(raw, axis=1)]
+
+
+class IncrementalScorer:
+    """Re-scores one evolving symptom vector by walking only the trees it affects.
+
+    Keeps the leaf reached in every tree for the current vector. Toggling a
+    symptom re-walks just the trees with a split on that column (found through
+    a column -> trees index built once) and swaps their leaf values into the
+    per-tree contribution table. Class scores are then re-summed in stage
+    order, which keeps them bit-identical to ``FlatGradientBoosting``.
+    """
+
+    def __init__(self, flat):
+        self.flat = flat
+        n_nodes = len(flat.feature)
+        n_trees = len(flat.roots)
+        tree_of = np.repeat(np.arange(n_trees), np.diff(np.append(flat.roots, n_nodes)))
+        internal = flat.children[0::2] != np.arange(n_nodes)
+        # Distinct (column, tree) split pairs, sorted by column then tree
+        splits = np.zeros(flat.n_features_in_ * n_trees, dtype=bool)
+        splits[flat.feature[internal] * n_trees + tree_of[internal]] = True
+        columns, self.trees = np.divmod(np.flatnonzero(splits), n_trees)
+        # Trees splitting on column j: trees[ptr[j]:ptr[j + 1]]
+        self.ptr = np.zeros(flat.n_features_in_ + 1, dtype=np.intp)
+        np.cumsum(np.bincount(columns, minlength=flat.n_features_in_), out=self.ptr[1:])
+        self.x = np.zeros(flat.n_features_in_, dtype=np.float64)
+        self.updates = 0  # toggles that changed the vector
+        self.trees_walked = 0  # trees re-walked over all updates
+        self.reset()
+
+    def reset(self):
+        """Back to the all-absent vector, scored in full"""
+        self.x[:] = 0
+        self.leaves = self.flat.apply(self.x[None, :])[0]
+        self.contrib = self.flat.value[self.leaves].reshape(self.flat.n_stages, self.flat.n_outputs)
+
+    def set_indices(self, indices):
+        """Move to the vector with exactly ``indices`` set, toggling the difference"""
+        target = np.zeros_like(self.x)
+        target[np.asarray(indices, dtype=np.intp)] = 1
+        self.toggle(np.flatnonzero(target != self.x))
+
+    def toggle(self, columns):
+        """Flip the given columns and re-walk the trees that split on them"""
+        columns = np.atleast_1d(np.asarray(columns, dtype=np.intp))
+        if not len(columns):
+            return
+        self.x[columns] = 1 - self.x[columns]
+        if len(columns) == 1:
+            trees = self.trees[self.ptr[columns[0]]:self.ptr[columns[0] + 1]]
+        else:
+            hit = np.zeros(len(self.leaves), dtype=bool)
+            for j in columns:
+                hit[self.trees[self.ptr[j]:self.ptr[j + 1]]] = True
+            trees = np.flatnonzero(hit)
+        self.updates += 1
+        if not len(trees):
+            return
+        flat = self.flat
+        node = flat.roots[trees]
+        for _ in range(flat.max_depth):
+            go_right = ~(self.x[flat.feature[node]] <= flat.threshold[node])
+            node = flat.children[2 * node + go_right]
+        self.leaves[trees] = node
+        self.contrib.reshape(-1)[trees] = flat.value[node]
+        self.trees_walked += len(trees)
+
+    def decision_function(self):
+        return self.flat.accumulate(self.contrib[None].copy())
+
+    def predict_proba(self):
+        return self.flat.proba_from_raw(self.decision_function())
+
+
+def check_incremental(flat, n_steps=2000, seed=0):
+    """True if random toggle sequences always match a full predict_proba bit for bit"""
+    rng = np.random.default_rng(seed)
+    scorer = IncrementalScorer(flat)
+    for step in range(n_steps):
+        if step % 10 == 0:
+            # Occasionally jump to an unrelated vector, as a new patient would
+            scorer.set_indices(rng.choice(flat.n_features_in_, rng.integers(0, 8), replace=False))
+        else:
+            scorer.toggle(rng.integers(flat.n_features_in_))
+        full = flat.predict_proba(scorer.x[None, :])
+        if not (np.array_equal(full, scorer.predict_proba())
+                and np.array_equal(flat.apply(scorer.x[None, :])[0], scorer.leaves)):
+            return False
+    return True
+
+
+def check_equivalence(model, flat, X):
+    """True if raw scores, probabilities and labels match sklearn bit for bit"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    return (np.array_equal(model.decision_function(X).reshape(len(X), -1), flat.decision_function(X))
+            and np.array_equal(model.predict_proba(X), flat.predict_proba(X))
+            and np.array_equal(model.predict(X), flat.predict(X)))
+
+
+def main():
+    import pickle
+
+    from engine import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Export model.pkl to flat NumPy arrays, or verify an existing export")
+    parser.add_argument('--model', default=MODEL_PATH, help="pickled GradientBoostingClassifier")
+    parser.add_argument('--output', help="npz to write (default: next to the model)")
+    parser.add_argument('--check', action='store_true',
+                        help="verify the existing npz against the model bit for bit, without rewriting it")
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.model)[0] + ".npz"
+
+    with open(args.model, 'rb') as f:
+        model = pickle.load(f)
+    if not args.check:
+        export_model(model, output, args.model)
+        flat = FlatGradientBoosting.load(output)
+        print(f"Wrote {output}: {len(flat.roots)} trees, {len(flat.feature)} nodes")
+    else:
+        from train import load_training_data
+
+        flat = FlatGradientBoosting.load(output)
+        exported_from = FlatGradientBoosting.read_source(output) == source_stamp(args.model)
+        print(f"{output} exported from {args.model}: {exported_from}")
+
+        X, _ = load_training_data()
+        rng = np.random.default_rng(0)
+        X = np.vstack([X, (rng.random((2000, X.shape[1])) < 0.05).astype(np.float32)])
+        if hasattr(model, 'feature_names_in_'):
+            del model.feature_names_in_
+        ok = check_equivalence(model, flat, X)
+        print(f"Bit-exact on {len(X)} rows: {ok}")
+        incremental_ok = check_incremental(flat)
+        print(f"Incremental re-scoring bit-exact: {incremental_ok}")
+        if not (exported_from and ok and incremental_ok):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""Disease-keyed knowledge index built once from the data/ CSVs"""
+import argparse
+import ast
+import hashlib
+import html
+import os
+import pickle
+from collections import namedtuple
+
+from engine import DATA_PATH
+
+# Spellings that differ between the model labels and the CSV files
+ALIASES = {'peptic ulcer diseae': 'peptic ulcer disease'}
+
+NA_HTML = "<ul><li>N/A</li></ul>"
+
+CACHE_PATH = os.path.join(DATA_PATH, "knowledge.cache")
+# Bump whenever the pickled layout changes
+CACHE_VERSION = 2
+
+# Source files and the only columns read from each
+SOURCES = {
+    "description.csv": ['Disease', 'Description'],
+    "precautions_df.csv": ['Disease', 'Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4'],
+    "medications.csv": ['Disease', 'Medication'],
+    "diets.csv": ['Disease', 'Diet'],
+    "workout_df.csv": ['disease', 'workout'],
+    "symtoms_df.csv": ['Disease', 'Symptom_1', 'Symptom_2', 'Symptom_3', 'Symptom_4'],
+}
+
+DiseaseInfo = namedtuple('DiseaseInfo', [
+    'name', 'description', 'precautions', 'medications', 'diets', 'workouts',
+    'precautions_html', 'medications_html', 'diets_html', 'workouts_html',
+])
+
+
+def normalize(name):
+    """Canonical lookup key: trimmed, single-spaced, lower case"""
+    key = " ".join(str(name).split()).lower()
+    return ALIASES.get(key, key)
+
+
+def clean_items(values):
+    """Flatten raw CSV cells into display strings, expanding "['a', 'b']" lists"""
+    items = []
+    for raw_val in values:
+        if raw_val is None:
+            continue
+        val = str(raw_val).strip()
+        if not val or val.lower() == 'nan':
+            continue
+        if val.startswith('[') and val.endswith(']'):
+            try:
+                parsed = ast.literal_eval(val)
+            except (ValueError, SyntaxError):
+                parsed = None
+            if isinstance(parsed, list):
+                items.extend(str(x).strip() for x in parsed if str(x).strip())
+                continue
+        items.append(val)
+    return items
+
+
+def canonical_symptoms(cells):
+    """Sorted tuple of distinct symptom names, trimming the CSV's leading spaces"""
+    return tuple(sorted({str(c).strip() for c in cells
+                         if c is not None and str(c).strip() and str(c).lower() != 'nan'}))
+
+
+def symptom_records(df):
+    """Collapse symtoms_df rows into (disease, symptom tuple, count) triples"""
+    counts = {}
+    cols = [c for c in df.columns if c.startswith('Symptom_')]
+    for row in df[['Disease'] + cols].itertuples(index=False):
+        key = (str(row[0]), canonical_symptoms(row[1:]))
+        counts[key] = counts.get(key, 0) + 1
+    return [(disease, symptoms, n) for (disease, symptoms), n in counts.items()]
+
+
+def render_list(items):
+    """Render items as an HTML <ul> fragment"""
+    if not items:
+        return NA_HTML
+    return "<ul>" + "".join(f"<li>{html.escape(x)}</li>" for x in items) + "</ul>"
+
+
+def make_info(name, description, precautions, medications, diets, workouts):
+    return DiseaseInfo(
+        name, description, precautions, medications, diets, workouts,
+        render_list(precautions), render_list(medications),
+        render_list(diets), render_list(workouts),
+    )
+
+
+class KnowledgeBase:
+    """Pre-parsed description, precautions, medications, diet and workout per disease.
+
+    Everything is parsed and rendered once, so a results page is filled with
+    a dict lookup instead of boolean masks over DataFrames. ``symptom_rows``
+    holds the de-duplicated training records from symtoms_df.csv as
+    ``(disease, sorted symptom tuple, count)``.
+    """
+
+    def __init__(self, entries, symptom_rows=()):
+        # entries: normalized name -> DiseaseInfo
+        self.entries = entries
+        self.symptom_rows = list(symptom_rows)
+        self._exact = {}
+
+    @property
+    def symptom_sets(self):
+        """Distinct canonical symptom sets seen in the training records"""
+        return list(dict.fromkeys(symptoms for _, symptoms, _ in self.symptom_rows))
+
+    def get(self, disease):
+        """Return the DiseaseInfo for a model label, or a placeholder if unknown"""
+        info = self._exact.get(disease)
+        if info is None:
+            info = self.entries.get(normalize(disease))
+            if info is None:
+                return self.missing(disease)
+            self._exact[disease] = info
+        return info
+
+    def __contains__(self, disease):
+        return normalize(disease) in self.entries
+
+    @staticmethod
+    def missing(disease):
+        return DiseaseInfo(disease, "Detailed data unavailable.", [], [], [], [],
+                           NA_HTML, NA_HTML, NA_HTML, NA_HTML)
+
+    @classmethod
+    def from_frames(cls, description, precautions, medications, diets, workout, symptoms=None):
+        """Build the index from the knowledge DataFrames"""
+        def grouped(df, disease_col, cols):
+            out = {}
+            for row in df[[disease_col] + cols].itertuples(index=False):
+                out.setdefault(normalize(row[0]), []).extend(clean_items(row[1:]))
+            return out
+
+        names = {}
+        descriptions = {}
+        for disease, desc in description[['Disease', 'Description']].itertuples(index=False):
+            key = normalize(disease)
+            names[key] = " ".join(str(disease).split())
+            descriptions.setdefault(key, []).append(str(desc).strip())
+
+        prec = grouped(precautions, 'Disease', ['Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4'])
+        meds = grouped(medications, 'Disease', ['Medication'])
+        diet = grouped(diets, 'Disease', ['Diet'])
+        work = grouped(workout, 'disease', ['workout'])
+
+        entries = {}
+        for key in set(names) | set(prec) | set(meds) | set(diet) | set(work):
+            entries[key] = make_info(
+                names.get(key, key),
+                " ".join(descriptions.get(key, [])) or "Detailed data unavailable.",
+                prec.get(key, []), meds.get(key, []), diet.get(key, []), work.get(key, []),
+            )
+        return cls(entries, [] if symptoms is None else symptom_records(symptoms))
+
+    @classmethod
+    def from_csv(cls, data_path=DATA_PATH):
+        """Parse the knowledge CSVs (used columns only) and build the index"""
+        import pandas as pd
+
+        frames = [pd.read_csv(os.path.join(data_path, name), usecols=cols) for name, cols in SOURCES.items()]
+        return cls.from_frames(*frames)
+
+    @classmethod
+    def load(cls, data_path=DATA_PATH, cache_path=CACHE_PATH):
+        """Load from the compiled cache, rebuilding it if any source CSV changed"""
+        if cache_path:
+            kb = read_cache(data_path, cache_path)
+            if kb is not None:
+                return kb
+        kb = cls.from_csv(data_path)
+        if cache_path:
+            try:
+                write_cache(kb, data_path, cache_path)
+            except OSError as e:
+                print(f"Could not write knowledge cache {cache_path}: {e}")
+        return kb
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_stamps(data_path):
+    """(size, mtime_ns, sha1) for every source CSV"""
+    stamps = {}
+    for name in SOURCES:
+        st = os.stat(os.path.join(data_path, name))
+        stamps[name] = (st.st_size, st.st_mtime_ns, file_digest(os.path.join(data_path, name)))
+    return stamps
+
+
+def is_fresh(data_path, stamps):
+    """Cheap stat check first; only hash files whose size/mtime moved.
+
+    A file whose mtime moved but whose content still matches gets its new
+    mtime written into ``stamps``, so the caller can store it and skip the
+    hash next time.
+    """
+    if set(stamps) != set(SOURCES):
+        return False
+    for name, (size, mtime_ns, digest) in list(stamps.items()):
+        path = os.path.join(data_path, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns != mtime_ns:
+            if file_digest(path) != digest:
+                return False
+            stamps[name] = (size, st.st_mtime_ns, digest)
+    return True
+
+
+def write_cache(kb, data_path=DATA_PATH, cache_path=CACHE_PATH):
+    """Compile the index into a single pickle next to the data"""
+    payload = {
+        'version': CACHE_VERSION,
+        'sources': source_stamps(data_path),
+        'entries': {key: tuple(info) for key, info in kb.entries.items()},
+        'symptom_rows': kb.symptom_rows,
+    }
+    write_payload(payload, cache_path)
+
+
+def write_payload(payload, cache_path):
+    """Atomically replace ``cache_path``; the temp file never outlives a failure"""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_cache(data_path=DATA_PATH, cache_path=CACHE_PATH):
+    """Return the cached KnowledgeBase, or None if missing, corrupt or stale"""
+    try:
+        with open(cache_path, 'rb') as f:
+            payload = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable knowledge cache {cache_path}: {e}")
+        return None
+    if not isinstance(payload, dict) or payload.get('version') != CACHE_VERSION:
+        return None
+    sources = dict(payload.get('sources', {}))
+    if not is_fresh(data_path, sources):
+        return None
+    if sources != payload['sources']:
+        # Touched but unchanged CSVs: store their new mtimes to skip the hash next time
+        payload['sources'] = sources
+        try:
+            write_payload(payload, cache_path)
+        except OSError as e:
+            print(f"Could not update knowledge cache {cache_path}: {e}")
+    entries = {key: DiseaseInfo._make(info) for key, info in payload['entries'].items()}
+    return KnowledgeBase(entries, payload['symptom_rows'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile data/*.csv into the knowledge cache")
+    parser.add_argument('--data', default=DATA_PATH, help="directory holding the source CSVs")
+    parser.add_argument('--output', default=CACHE_PATH, help="cache file to write")
+    parser.add_argument('--force', action='store_true', help="rebuild even if the cache is fresh")
+    args = parser.parse_args()
+
+    if not args.force and read_cache(args.data, args.output) is not None:
+        print(f"{args.output} is up to date")
+        return
+    kb = KnowledgeBase.from_csv(args.data)
+    write_cache(kb, args.data, args.output)
+    print(f"Wrote {len(kb.entries)} diseases and {len(kb.symptom_rows)} symptom sets to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
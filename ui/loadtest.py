@@ -0,0 +1,102 @@
+"""Closed-loop load generator for ui/server.py"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+
+import numpy as np
+
+from knowledge import KnowledgeBase
+
+
+def request_bodies(batch, seed=0):
+    """Endless JSON /predict bodies drawn from the training symptom sets.
+
+    One symptom in three is dropped so that not every request is answered
+    from the server's precomputed table.
+    """
+    sets = KnowledgeBase.load().symptom_sets
+    rng = random.Random(seed)
+
+    def patient():
+        symptoms = list(rng.choice(sets))
+        if len(symptoms) > 1 and rng.random() < 1 / 3:
+            symptoms.pop(rng.randrange(len(symptoms)))
+        return symptoms
+
+    while True:
+        if batch == 1:
+            yield json.dumps({'symptoms': patient()}).encode()
+        else:
+            yield json.dumps({'patients': [patient() for _ in range(batch)]}).encode()
+
+
+def client(host, port, bodies, deadline, latencies, errors, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    while time.perf_counter() < deadline:
+        with lock:
+            body = next(bodies)
+        t = time.perf_counter()
+        try:
+            conn.request('POST', '/predict', body, headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            ok = False
+        elapsed = time.perf_counter() - t
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+    conn.close()
+
+
+def run(host, port, concurrency, seconds, batch=1, seed=0):
+    """Requests/s, patients/s and latency percentiles over ``seconds``"""
+    bodies = request_bodies(batch, seed)
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=client, args=(host, port, bodies, deadline, latencies, errors, lock))
+               for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - t0
+    ms = np.percentile(latencies, [50, 95, 99]) * 1e3 if latencies else [float('nan')] * 3
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_s': len(latencies) / elapsed,
+        'patients_per_s': len(latencies) * batch / elapsed,
+        'p50_ms': float(ms[0]),
+        'p95_ms': float(ms[1]),
+        'p99_ms': float(ms[2]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running ui/server.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, default=8, help="parallel keep-alive connections")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--batch', type=int, default=1, help="patients per request")
+    args = parser.parse_args()
+
+    r = run(args.host, args.port, args.concurrency, args.seconds, args.batch)
+    print(f"{r['requests']} requests, {r['errors']} errors: {r['requests_per_s']:.0f} req/s, "
+          f"{r['patients_per_s']:.0f} patients/s, "
+          f"p50 {r['p50_ms']:.2f} ms, p95 {r['p95_ms']:.2f} ms, p99 {r['p99_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
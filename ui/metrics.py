@@ -0,0 +1,178 @@
+"""Always-on stage timings, counters and their Prometheus text rendering"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bucket edges for durations in seconds, 10 us to 5 s
+SECONDS_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Upper bucket edges for batch sizes
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+
+class Histogram:
+    """Counts observations into buckets with fixed upper edges.
+
+    Observing is a bisect and an increment, so it can sit on every request.
+    Percentiles interpolate linearly inside the bucket the rank falls in,
+    as Prometheus' ``histogram_quantile`` does.
+    """
+
+    def __init__(self, bounds=SECONDS_BUCKETS):
+        self.bounds = tuple(bounds)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+            self.count = 0
+            self.sum = 0.0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def percentile(self, q):
+        """Estimated ``q``-th percentile, None if empty; overflow reads as the last edge"""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank = q / 100 * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def as_dict(self):
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        edges = [str(b) for b in self.bounds] + ['+Inf']
+        summary = {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else None,
+            'buckets': dict(zip(edges, counts)),
+        }
+        for q in (50, 95, 99):
+            summary[f'p{q}'] = self.percentile(q)
+        return summary
+
+
+class Registry:
+    """Named stage histograms and counters for one process.
+
+    ``stage()`` / ``observe()`` time a step of the request path into the
+    ``neuralcare_stage_seconds`` histogram under its stage label; ``inc()``
+    bumps a ``neuralcare_<name>_total`` counter. Collectors are callables
+    returning ``{name: value}``, sampled only when metrics are rendered, for
+    numbers something else already keeps (cache hits, startup phases).
+    """
+
+    def __init__(self, prefix='neuralcare'):
+        self.prefix = prefix
+        self.stages = {}  # stage -> Histogram of seconds
+        self.histograms = {}  # name -> (Histogram, help)
+        self.counters = {}
+        self.collectors = []  # (callable, metric type, help)
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        hist = self.stages.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(stage, Histogram())
+        hist.observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def histogram(self, name, bounds=SECONDS_BUCKETS, help=""):
+        """A standalone histogram exported as ``<prefix>_<name>``"""
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = (Histogram(bounds), help)
+            return self.histograms[name][0]
+
+    def add_collector(self, collect, kind='gauge', help=""):
+        with self._lock:
+            self.collectors.append((collect, kind, help))
+
+    def summary(self):
+        """Per-stage ``(count, p50, p95, p99)`` in seconds and the counters"""
+        with self._lock:
+            stages, counters = dict(self.stages), dict(self.counters)
+        return {
+            'stages': {name: (h.count, h.percentile(50), h.percentile(95), h.percentile(99))
+                       for name, h in sorted(stages.items())},
+            'counters': counters,
+        }
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        p = self.prefix
+        with self._lock:
+            stages, counters = dict(self.stages), dict(self.counters)
+            histograms, collectors = dict(self.histograms), list(self.collectors)
+        lines = []
+        if stages:
+            lines += [f"# HELP {p}_stage_seconds Time spent per request-path stage",
+                      f"# TYPE {p}_stage_seconds histogram"]
+            for name, hist in sorted(stages.items()):
+                lines += _histogram_lines(f"{p}_stage_seconds", hist, f'stage="{name}"')
+        for name, (hist, help) in sorted(histograms.items()):
+            lines += [f"# HELP {p}_{name} {help}", f"# TYPE {p}_{name} histogram"]
+            lines += _histogram_lines(f"{p}_{name}", hist)
+        for name, value in sorted(counters.items()):
+            lines += [f"# TYPE {p}_{name}_total counter", f"{p}_{name}_total {value}"]
+        for collect, kind, help in collectors:
+            # Names may carry labels, 'rows{stage="cheap"}'; TYPE once per family
+            typed = set()
+            for name, value in sorted(collect().items()):
+                family, brace, labels = name.partition('{')
+                metric = f"{p}_{family}_total" if kind == 'counter' else f"{p}_{family}"
+                if metric not in typed:
+                    typed.add(metric)
+                    if help:
+                        lines.append(f"# HELP {metric} {help}")
+                    lines.append(f"# TYPE {metric} {kind}")
+                lines.append(f"{metric}{brace}{labels} {value}")
+        lines += [f"# TYPE {p}_process_id gauge", f"{p}_process_id {os.getpid()}"]
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(metric, hist, labels=""):
+    with hist._lock:
+        counts, count, total = list(hist.counts), hist.count, hist.sum
+    sep = "," if labels else ""
+    lines, cumulative = [], 0
+    for edge, n in zip([repr(b) for b in hist.bounds] + ['+Inf'], counts):
+        cumulative += n
+        lines.append(f'{metric}_bucket{{{labels}{sep}le="{edge}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines += [f"{metric}_sum{suffix} {total}", f"{metric}_count{suffix} {count}"]
+    return lines
+
+
+# Shared by the engine, the apps and the HTTP servers of this process
+REGISTRY = Registry()
@@ -0,0 +1,71 @@
+"""Pre-forked worker processes sharing one loaded model copy-on-write"""
+import gc
+import os
+import signal
+import time
+
+# A worker that dies sooner than this after starting is restarted only after
+# the same delay, so a crash at startup does not turn into a fork loop
+RESTART_DELAY = 1.0
+
+
+def run_workers(processes, serve):
+    """Fork ``processes`` children that each call ``serve()``; blocks until stopped.
+
+    Load the model, knowledge base and listening socket before calling this:
+    children inherit them, so the arrays are shared copy-on-write and the
+    kernel spreads incoming connections over the workers accepting on the
+    one socket. Everything allocated so far is moved to a permanent GC
+    generation first, so collections in the workers do not write to (and
+    copy) the shared pages. Workers that die are replaced; SIGINT or SIGTERM
+    stops them all.
+    """
+    gc.collect()
+    gc.freeze()
+    children = {}  # pid -> start time
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            code = 0
+            try:
+                serve()
+            except KeyboardInterrupt:
+                pass
+            except Exception as e:
+                print(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(processes):
+        spawn()
+    print(f"Started {processes} workers: {', '.join(str(pid) for pid in children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        if time.monotonic() - started < RESTART_DELAY:
+            time.sleep(RESTART_DELAY)
+        if not stopping:
+            spawn()
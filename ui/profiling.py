@@ -0,0 +1,254 @@
+"""Opt-in cProfile, tracemalloc and import-time reports for "the app is slow" bugs"""
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+# Set to a directory (or to 1 for ./profiles) to profile startup and every
+# analysis; passing --profile on the command line does the same
+PROFILE_ENV = 'NEURALCARE_PROFILE'
+PROFILE_FLAG = '--profile'
+DEFAULT_DIR = 'profiles'
+# Functions and allocation sites listed in each text report
+REPORT_LINES = 40
+# Frames kept per traced allocation; more makes tracemalloc slower
+TRACE_FRAMES = 1
+
+# The active ProfileSession, None when profiling is off
+SESSION = None
+NO_PROFILE = nullcontext()
+
+
+class ImportTimer:
+    """Meta path finder recording how long each module takes to execute.
+
+    The same numbers as ``python -X importtime`` (self and cumulative time,
+    nested by import depth) but for modules imported after it is installed,
+    without having to restart the interpreter with the flag.
+    """
+
+    def __init__(self):
+        self.records = []  # (name, self seconds, cumulative seconds, depth) in completion order
+        self._local = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Builtin and frozen importers are classes shared by every module; those are fast anyway
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, 'exec_module'):
+            try:
+                loader.exec_module = self.timed(name, loader, loader.exec_module)
+            except AttributeError:
+                pass
+        return spec
+
+    def timed(self, name, loader, exec_module):
+        def run(module):
+            stack = self._local.__dict__.setdefault('stack', [])
+            stack.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                total = time.perf_counter() - t0
+                children = stack.pop()
+                if stack:
+                    stack[-1] += total
+                self.records.append((name, total - children, total, len(stack)))
+                del loader.exec_module
+        return run
+
+    def report(self, out):
+        records = list(self.records)
+        out.write(f"{len(records)} modules, {sum(r[1] for r in records) * 1e3:.0f} ms\n\n")
+        out.write("Slowest (cumulative):\n")
+        for name, own, total, depth in sorted(records, key=lambda r: -r[2])[:REPORT_LINES]:
+            out.write(f"{total * 1e3:10.1f} ms  {name}\n")
+        out.write("\nimport time:  self [us] | cumulative | imported package\n")
+        for name, own, total, depth in records:
+            out.write(f"import time: {own * 1e6:10.0f} | {total * 1e6:10.0f} | {'  ' * depth}{name}\n")
+
+
+class ProfileSession:
+    """One timestamped report directory; ``profile(name)`` writes a report per block.
+
+    Every block gets ``<name>-<n>.prof`` (load it with pstats or snakeviz)
+    and ``<name>-<n>.txt`` with wall time, the top functions by cumulative
+    time and the allocations made inside the block that are still alive at
+    its end. Traces are cleared when a block starts, since diffing whole-heap
+    snapshots takes seconds once numpy and Qt are loaded; a block that starts
+    while another runs on a different thread leaves them alone, so the two
+    see each other's allocations. Only one cProfile profiler can run at a
+    time (from Python 3.12 a second ``enable()`` raises), so a block that
+    overlaps one being profiled gets the memory report only, and says which
+    block held the profiler. ``imports.txt`` is rewritten after each block
+    and at exit.
+    """
+
+    def __init__(self, root, label):
+        import atexit
+        import tracemalloc
+
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        self.path = os.path.join(root, f"{stamp}-{label}-{os.getpid()}")
+        os.makedirs(self.path, exist_ok=True)
+        self.counts = {}
+        self.active = 0  # blocks running now, on any thread
+        self.profiling = None  # name of the block holding the cProfile profiler
+        self._lock = threading.Lock()
+        self.imports = ImportTimer()
+        sys.meta_path.insert(0, self.imports)
+        tracemalloc.start(TRACE_FRAMES)
+        atexit.register(self.write_imports)
+
+    def next_name(self, name):
+        with self._lock:
+            n = self.counts[name] = self.counts.get(name, 0) + 1
+        return f"{name}-{n:03d}"
+
+    def profile(self, name):
+        return _Block(self, self.next_name(name))
+
+    def write_imports(self):
+        with open(os.path.join(self.path, 'imports.txt'), 'w') as f:
+            self.imports.report(f)
+
+    def write(self, name, profiler, skipped, seconds, snapshot, peak):
+        import cProfile
+        import pstats
+        import tracemalloc
+
+        if profiler is not None:
+            profiler.dump_stats(os.path.join(self.path, f"{name}.prof"))
+        with open(os.path.join(self.path, f"{name}.txt"), 'w') as f:
+            f.write(f"{name}: {seconds * 1e3:.1f} ms wall, thread {threading.current_thread().name}\n")
+            f.write(f"traced memory: {peak / 1e6:.1f} MB peak during the block\n\n")
+            if profiler is not None:
+                stats = pstats.Stats(profiler, stream=f)
+                stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+            else:
+                f.write(f"No cProfile report: {skipped}\n\n")
+            f.write("Allocations made in the block and still alive (by line):\n")
+            # Leave out what taking the profile itself allocated
+            ignore = [tracemalloc.Filter(False, module.__file__)
+                      for module in (tracemalloc, pstats, cProfile, sys.modules[__name__])]
+            for stat in snapshot.filter_traces(ignore).statistics('lineno')[:REPORT_LINES]:
+                f.write(f"{stat}\n")
+        self.write_imports()
+
+
+class _Block:
+    def __init__(self, session, name):
+        self.session = session
+        self.name = name
+
+    def __enter__(self):
+        import cProfile
+        import tracemalloc
+
+        session = self.session
+        self.profiler = None
+        with session._lock:
+            if not session.active:
+                tracemalloc.clear_traces()
+            session.active += 1
+            try:
+                if session.profiling is None:
+                    profiler = cProfile.Profile()
+                    profiler.enable()
+                    self.profiler = profiler
+                    session.profiling = self.name
+                    self.skipped = None
+                else:
+                    self.skipped = f"{session.profiling} was being profiled at the same time"
+            except ValueError as e:  # another profiler or debugger is active
+                self.skipped = str(e)
+            except BaseException:
+                session.active -= 1
+                raise
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        import tracemalloc
+
+        session = self.session
+        try:
+            if self.profiler is not None:
+                self.profiler.disable()
+            seconds = time.perf_counter() - self.t0
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            with session._lock:
+                session.active -= 1
+                if self.profiler is not None:
+                    session.profiling = None
+        try:
+            session.write(self.name, self.profiler, self.skipped, seconds, tracemalloc.take_snapshot(), peak)
+        except Exception as e:
+            print(f"Error writing profile {self.name}: {e}")
+
+
+def enable(root=DEFAULT_DIR, label=None):
+    """Start profiling into a new timestamped directory under ``root``"""
+    global SESSION
+    if SESSION is None:
+        label = label or os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+        SESSION = ProfileSession(root, label)
+        print(f"Profiling to {SESSION.path}", file=sys.stderr)
+    return SESSION
+
+
+def profiled(name):
+    """Context manager profiling its block when profiling is on, a shared no-op otherwise"""
+    if SESSION is None:
+        return NO_PROFILE
+    return SESSION.profile(name)
+
+
+def profile_calls(name):
+    """Decorator profiling every call when profiling is on.
+
+    Decided when the function is defined: with profiling off the function is
+    returned unchanged, so it costs nothing at all.
+    """
+    def decorate(fn):
+        if SESSION is None:
+            return fn
+        import inspect
+
+        params = inspect.signature(fn).parameters.values()
+        if any(p.kind == p.VAR_POSITIONAL for p in params):
+            positional = None
+        else:
+            positional = sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in params)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Qt signals pass arguments a slot may not take (clicked's
+            # "checked"); drop them as PyQt does for the undecorated slot
+            with SESSION.profile(name):
+                return fn(*args[:positional], **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_argument(parser):
+    """The --profile flag for argparse tools (acted on when this module is imported)"""
+    parser.add_argument(PROFILE_FLAG, action='store_true',
+                        help=f"write cProfile, tracemalloc and import-time reports under ${PROFILE_ENV} "
+                             f"or ./{DEFAULT_DIR}")
+
+
+_env = os.environ.get(PROFILE_ENV, '')
+if _env or PROFILE_FLAG in sys.argv[1:]:
+    enable(DEFAULT_DIR if _env in ('', '1') else _env)
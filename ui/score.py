@@ -0,0 +1,210 @@
+"""Stream a CSV of patients through the model in fixed-size chunks"""
+import argparse
+import csv
+import os
+import stat
+import sys
+import time
+
+# Imported first so that, when profiling is on, the imports below are timed
+import profiling
+import numpy as np
+
+from engine import DISEASES_LIST, SYMPTOMS_DICT, DiagnosisEngine, SymptomEncoder
+from feature_store import FeatureStore
+from knowledge import KnowledgeBase
+from symptom_search import tokens
+
+# Patients read, encoded and predicted together; memory use is bounded by it
+CHUNK_ROWS = 10000
+
+JOINS = ('description', 'precautions')
+
+
+class ChunkEncoder:
+    """Turns one CSV chunk into an N x 132 matrix in ``symptoms_dict`` order.
+
+    A file whose header holds every symptoms_dict key is read as the one-hot
+    layout. Otherwise every column whose name starts with "symptom" holds
+    symptom names, one per cell (or several separated by ";"), spelled as
+    the key or as displayed ("Skin Rash"). All other columns are passed
+    through to the output untouched.
+    """
+
+    def __init__(self, columns):
+        self.onehot = set(SYMPTOMS_DICT) <= set(columns)
+        if self.onehot:
+            self.symptom_columns = list(SYMPTOMS_DICT)
+        else:
+            self.symptom_columns = [c for c in columns if c.strip().lower().startswith('symptom')]
+            if not self.symptom_columns:
+                raise ValueError("Input needs the symptoms_dict one-hot columns or Symptom_* columns")
+        self.passthrough = [c for c in columns if c not in set(self.symptom_columns)]
+        self.encoder = SymptomEncoder(SYMPTOMS_DICT)
+        self.keys = {'_'.join(tokens(k)): k for k in SYMPTOMS_DICT}
+        self.unknown = {}  # unrecognized symptom name -> occurrences
+
+    def dtypes(self):
+        if self.onehot:
+            return {c: np.float32 for c in self.symptom_columns}
+        return {c: str for c in self.symptom_columns}
+
+    def column(self, cell):
+        """symptoms_dict column for one cell value, None if empty or unknown"""
+        index = self.encoder.index.get(cell)
+        if index is None:
+            key = self.keys.get('_'.join(tokens(cell)))
+            if key is None:
+                self.unknown[cell] = self.unknown.get(cell, 0) + 1
+                return None
+            index = self.encoder.index[key]
+        return index
+
+    def encode(self, chunk):
+        if self.onehot:
+            return np.ascontiguousarray(chunk[self.symptom_columns].fillna(0).to_numpy(np.float32))
+        rows, cols = [], []
+        for i, cells in enumerate(chunk[self.symptom_columns].itertuples(index=False)):
+            for cell in cells:
+                if not isinstance(cell, str):
+                    continue
+                for name in cell.split(';'):
+                    name = name.strip()
+                    if name:
+                        j = self.column(name)
+                        if j is not None:
+                            rows.append(i)
+                            cols.append(j)
+        X = np.zeros((len(chunk), self.encoder.n_features), dtype=np.float32)
+        X[rows, cols] = 1
+        return X
+
+
+def add_joins(out, diseases, knowledge, joins):
+    if 'description' in joins:
+        out['Description'] = [knowledge.get(d).description for d in diseases]
+    if 'precautions' in joins:
+        out['Precautions'] = ["; ".join(knowledge.get(d).precautions) for d in diseases]
+
+
+@profiling.profile_calls('score')
+def score_store(engine, store, output, chunk_rows=CHUNK_ROWS, knowledge=None, joins=(), progress=None):
+    """Score a FeatureStore into ``output``; returns (rows, seconds).
+
+    Chunks are sliced straight from the memory-mapped packed rows and only
+    their distinct rows are ever unpacked. Rows are identified by their
+    position; a labelled store also gets its label as ``Disease``.
+    """
+    import pandas as pd
+
+    if store.columns != list(SYMPTOMS_DICT):
+        raise ValueError(f"{store.path} columns do not match the symptom vocabulary")
+    t0 = time.perf_counter()
+    for start in range(0, len(store), chunk_rows):
+        stop = min(start + chunk_rows, len(store))
+        diseases = engine.predict_packed(store.packed[start:stop])
+        out = pd.DataFrame({'row': np.arange(start, stop)})
+        if store.labels is not None:
+            out['Disease'] = [DISEASES_LIST.get(label, "Unknown") for label in store.labels[start:stop]]
+        out['Prediction'] = diseases
+        add_joins(out, diseases, knowledge, joins)
+        out.to_csv(output, header=start == 0, index=False)
+        if progress is not None:
+            progress(stop, stop / len(store))
+    return len(store), time.perf_counter() - t0
+
+
+@profiling.profile_calls('score')
+def score_file(engine, source, output, chunk_rows=CHUNK_ROWS, knowledge=None, joins=(), progress=None):
+    """Score ``source`` into ``output`` chunk by chunk; returns (rows, seconds, ChunkEncoder).
+
+    ``source`` is a binary file object; ``progress(rows, fraction read)`` is
+    called after every chunk, with the fraction None when reading a pipe.
+    """
+    import pandas as pd
+
+    st = os.fstat(source.fileno())
+    size = st.st_size if stat.S_ISREG(st.st_mode) else 0
+    # Parsed by hand so that pipes, which cannot seek back, work too
+    header = next(csv.reader([source.readline().decode('utf-8-sig')]))
+    chunk_encoder = ChunkEncoder(header)
+    reader = pd.read_csv(source, chunksize=chunk_rows, header=None, names=header,
+                         dtype=chunk_encoder.dtypes(),
+                         usecols=chunk_encoder.passthrough + chunk_encoder.symptom_columns)
+
+    t0 = time.perf_counter()
+    rows = 0
+    for chunk in reader:
+        diseases = engine.predict_onehot(chunk_encoder.encode(chunk))
+        out = chunk[chunk_encoder.passthrough].copy()
+        out['Prediction'] = diseases
+        add_joins(out, diseases, knowledge, joins)
+        out.to_csv(output, header=rows == 0, index=False)
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows, source.tell() / size if size else None)
+    return rows, time.perf_counter() - t0, chunk_encoder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict a disease for every patient in a CSV file")
+    parser.add_argument('input', help="CSV with Symptom_* name columns or the 132 symptoms_dict columns "
+                                      "('-' for stdin), or a feature store directory")
+    parser.add_argument('--output', '-o', default='-', help="CSV to write ('-' for stdout)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_ROWS, help="patients per model call")
+    parser.add_argument('--join', nargs='*', choices=JOINS, default=[],
+                        help="add the disease description and/or precautions to every row")
+    parser.add_argument('--mode', choices=('full', 'fast'), help="engine mode (default: NEURALCARE_MODE)")
+    parser.add_argument('--quiet', '-q', action='store_true', help="no progress on stderr")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profiled('startup'):
+        knowledge = KnowledgeBase.load()
+        # Offline results should not depend on the cascade's confidence gate
+        engine = DiagnosisEngine(cascade_margin=None, **({} if args.mode is None else {'mode': args.mode}))
+        engine.set_training_records(knowledge.symptom_rows)
+        loaded = engine.load_model()
+    if not loaded:
+        raise SystemExit("No model could be loaded")
+
+    t0 = time.perf_counter()
+
+    def progress(rows, fraction):
+        rate = rows / (time.perf_counter() - t0)
+        done = f" ({fraction:.0%})" if fraction is not None else ""
+        print(f"\r{rows} rows{done}, {rate:.0f} rows/s", end='', file=sys.stderr, flush=True)
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        if os.path.isdir(args.input):
+            rows, seconds = score_store(engine, FeatureStore(args.input), output, args.chunk_size,
+                                        knowledge, args.join, None if args.quiet else progress)
+            layout, unknown = "feature store", {}
+        else:
+            source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+            with source:
+                rows, seconds, chunk_encoder = score_file(
+                    engine, source, output, args.chunk_size, knowledge, args.join,
+                    None if args.quiet else progress)
+            if chunk_encoder.onehot:
+                layout = "one-hot"
+            else:
+                layout = f"{len(chunk_encoder.symptom_columns)} symptom columns"
+            unknown = chunk_encoder.unknown
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Scored {rows} rows ({layout}) in {seconds:.1f}s, {rows / max(seconds, 1e-9):.0f} rows/s",
+          file=sys.stderr)
+    if unknown:
+        top = sorted(unknown.items(), key=lambda kv: -kv[1])[:5]
+        print(f"Ignored {sum(unknown.values())} unknown symptom names, e.g. "
+              + ", ".join(f"{name!r} x{n}" for name, n in top), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""Qt-free HTTP inference service: predictions and disease knowledge as JSON"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import unquote, urlsplit
+
+# Imported first so that, when profiling is on, the imports below are timed
+import profiling
+from engine import DiagnosisEngine
+from knowledge import KnowledgeBase
+from metrics import REGISTRY
+from prefork import run_workers
+from symptom_search import tokens
+from timing import PhaseTimer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Request handler threads; each keep-alive connection holds one while open
+DEFAULT_WORKERS = 8
+# Seconds an idle keep-alive connection may hold a worker
+IDLE_TIMEOUT = 5.0
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH = 10000
+MAX_TOP = 10
+
+
+class RequestError(Exception):
+    """A client error reported as ``{"error": message}`` with ``status``"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def check_length(length):
+    if length < 0:
+        raise RequestError(400, "negative Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f"body larger than {MAX_BODY_BYTES} bytes")
+
+
+def parse_json(body):
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise RequestError(400, "body is not valid JSON") from None
+
+
+def encode_payload(payload):
+    """Response body and Content-Type; str payloads are Prometheus text"""
+    if isinstance(payload, str):
+        return payload.encode(), 'text/plain; version=0.0.4; charset=utf-8'
+    return json.dumps(payload).encode(), 'application/json'
+
+
+class InferenceService:
+    """The JSON API on top of one shared engine and knowledge base.
+
+    Every method returns ``(status, payload)``; the HTTP layer only parses
+    requests and serializes what comes back, so the same service can sit
+    behind other front ends.
+    """
+
+    def __init__(self, engine, knowledge, startup=None):
+        self.engine = engine
+        self.knowledge = knowledge
+        REGISTRY.add_collector(engine.metrics, 'counter')
+        if startup is not None:
+            REGISTRY.add_collector(startup.metrics)
+        # Portal spellings such as "Skin Rash" -> "skin_rash"
+        self.symptom_keys = {'_'.join(tokens(k)): k for k in engine.symptoms_dict}
+        self.started = time.monotonic()
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, mode=None):
+        """Load the knowledge base and model once for the life of the process"""
+        startup = PhaseTimer()
+        with startup.phase("knowledge"):
+            knowledge = KnowledgeBase.load()
+        engine = DiagnosisEngine() if mode is None else DiagnosisEngine(mode=mode)
+        with startup.phase("fallback"):
+            engine.set_training_records(knowledge.symptom_rows)
+        with startup.phase("model"):
+            engine.load_model()
+        startup.milestone("ready")
+        return cls(engine, knowledge, startup)
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def resolve(self, symptoms):
+        """Split a client symptom list into vocabulary keys and unknown names"""
+        if not isinstance(symptoms, list) or not all(isinstance(s, str) for s in symptoms):
+            raise RequestError(400, "symptoms must be a list of strings")
+        known, unknown = [], []
+        for s in symptoms:
+            key = s if s in self.engine.symptoms_dict else self.symptom_keys.get('_'.join(tokens(s)))
+            if key is None:
+                unknown.append(s)
+            else:
+                known.append(key)
+        return known, unknown
+
+    def parse_predict(self, body):
+        """Validate a /predict body into ``(patients, unknown, single, top)``.
+
+        ``{"symptoms": [...]}`` is one patient (``single``), ``{"patients":
+        [[...], ...]}`` many; ``patients`` holds vocabulary keys only. A
+        single patient with no known symptom is a 422; in a batch such a
+        patient stays an empty list, left out by ``scored`` and answered null.
+        """
+        if not isinstance(body, dict) or ('symptoms' in body) == ('patients' in body):
+            raise RequestError(400, 'expected an object with either "symptoms" or "patients"')
+        if not self.engine.model_loaded:
+            raise RequestError(503, "model not loaded")
+
+        single = 'symptoms' in body
+        if single:
+            resolved = [self.resolve(body['symptoms'])]
+            if not resolved[0][0]:
+                raise RequestError(422, f"no known symptoms (unknown: {resolved[0][1]})")
+            top = body.get('top')
+            if top is not None and (not isinstance(top, int) or isinstance(top, bool)
+                                    or not 1 <= top <= MAX_TOP):
+                raise RequestError(400, f"top must be an integer from 1 to {MAX_TOP}")
+        else:
+            patients = body['patients']
+            if not isinstance(patients, list):
+                raise RequestError(400, "patients must be a list of symptom lists")
+            if len(patients) > MAX_BATCH:
+                raise RequestError(413, f"at most {MAX_BATCH} patients per request")
+            resolved = [self.resolve(p) for p in patients]
+            top = None
+        return [known for known, _ in resolved], [unknown for _, unknown in resolved], single, top
+
+    @staticmethod
+    def scored(patients):
+        """The patients to run through the model: those with a known symptom"""
+        return [p for p in patients if p]
+
+    def predict_response(self, parsed, diseases):
+        """The /predict reply for ``parsed`` given one disease per ``scored`` patient"""
+        patients, unknown, single, top = parsed
+        if not single:
+            diseases = iter(diseases)
+            return 200, {'diseases': [next(diseases) if p else None for p in patients], 'unknown': unknown}
+        result = {'disease': diseases[0], 'unknown': unknown[0]}
+        if top is not None:
+            result['differential'] = [{'disease': name, 'probability': p}
+                                      for name, p in self.engine.predict_top(patients[0], top)]
+        return 200, result
+
+    def predict(self, body):
+        parsed = self.parse_predict(body)
+        patients, _, single, _ = parsed
+        if single:
+            diseases = [self.engine.predict(patients[0])]
+        else:
+            diseases = self.engine.predict_batch(self.scored(patients))
+        return self.predict_response(parsed, diseases)
+
+    def disease(self, name):
+        if name not in self.knowledge:
+            raise RequestError(404, f"unknown disease {name!r}")
+        info = self.knowledge.get(name)
+        return 200, {
+            'name': info.name,
+            'description': info.description,
+            'precautions': info.precautions,
+            'medications': info.medications,
+            'diets': info.diets,
+            'workouts': info.workouts,
+        }
+
+    def handle(self, method, path, body=b''):
+        """Route one request to ``(status, payload)``; ``body`` is raw bytes.
+
+        A str payload is sent as plain text, anything else as JSON.
+        """
+        self.count()
+        t = time.perf_counter()
+        try:
+            if method == 'GET' and path == '/health':
+                return self.health()
+            if method == 'GET' and path == '/metrics':
+                return 200, REGISTRY.render()
+            if method == 'GET' and path.startswith('/disease/'):
+                with REGISTRY.stage('knowledge'):
+                    return self.disease(unquote(path[len('/disease/'):]))
+            if method == 'POST' and path == '/predict':
+                return self.predict(parse_json(body))
+            raise RequestError(404, f"no route for {method} {path}")
+        except RequestError as e:
+            REGISTRY.inc('client_errors')
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            REGISTRY.inc('errors')
+            print(f"Error handling {method} {path}: {e}")
+            return 500, {'error': "internal error"}
+        finally:
+            REGISTRY.observe('http', time.perf_counter() - t)
+
+    def health(self):
+        engine = self.engine
+        if not engine.model_loaded:
+            model = None
+        elif engine.using_fallback:
+            model = 'fallback'
+        else:
+            model = os.path.normpath(engine.model_source_path)
+        with self._lock:
+            requests = self.requests
+        return (200 if engine.model_loaded else 503), {
+            'status': 'ok' if engine.model_loaded else 'unavailable',
+            'mode': engine.mode,
+            'model': model,
+            'diseases': len(self.knowledge.entries),
+            'uptime_seconds': round(time.monotonic() - self.started, 3),
+            'requests': requests,
+            'pid': os.getpid(),
+        }
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'NeuralCare'
+    timeout = IDLE_TIMEOUT
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # body waits on the client's delayed ACK (~40 ms per request)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send(*self.server.service.handle('GET', urlsplit(self.path).path))
+
+    def do_POST(self):
+        try:
+            body = self.read_body()
+        except RequestError as e:
+            self.close_connection = True
+            self.send(e.status, {'error': str(e)})
+            return
+        self.send(*self.server.service.handle('POST', urlsplit(self.path).path, body))
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            raise RequestError(411, "Content-Length required") from None
+        check_length(length)
+        return self.rfile.read(length)
+
+    def send(self, status, payload):
+        data, content_type = encode_payload(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.access_log:
+            super().log_message(format, *args)
+
+
+class InferenceServer(HTTPServer):
+    """HTTPServer that hands each connection to a fixed pool of worker threads"""
+
+    def __init__(self, address, service, workers=DEFAULT_WORKERS, access_log=False):
+        super().__init__(address, RequestHandler)
+        self.service = service
+        self.access_log = access_log
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='neuralcare-http')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve predictions and disease information over HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="interface to bind (localhost only by default)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="request handler threads per process")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="pre-forked worker processes sharing the loaded model")
+    parser.add_argument('--mode', choices=('full', 'fast'), help="engine mode (default: NEURALCARE_MODE)")
+    parser.add_argument('--access-log', action='store_true', help="log every request to stderr")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    with profiling.profiled('startup'):
+        service = InferenceService.create(args.mode)
+    _, health = service.health()
+    print(f"Loaded {health['model']} in {(time.perf_counter() - t) * 1e3:.0f} ms")
+
+    server = InferenceServer((args.host, args.port), service, args.workers, args.access_log)
+    print(f"Serving on http://{args.host}:{server.server_port} with {args.workers} threads"
+          f" x {args.processes} processes")
+    try:
+        if args.processes > 1:
+            run_workers(args.processes, server.serve_forever)
+        else:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
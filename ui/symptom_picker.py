@@ -0,0 +1,137 @@
+"""Virtualized, checkable symptom list for large vocabularies"""
+from PyQt6.QtCore import Qt, QAbstractListModel, QEvent, QModelIndex, QSize, pyqtSignal
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate
+
+from symptom_search import display_name
+
+
+class SymptomListModel(QAbstractListModel):
+    """Symptom rows whose checked state lives in one integer bitset.
+
+    Bit ``i`` of ``bits`` is set when ``keys[i]`` is checked. Filtering only
+    changes which key indices are exposed as rows, so checks survive any
+    search. The view asks for data row by row, so only what is on screen is
+    ever rendered.
+    """
+
+    checked_changed = pyqtSignal(str, bool)
+
+    def __init__(self, keys, parent=None):
+        super().__init__(parent)
+        self.keys = list(keys)
+        self.labels = [display_name(k) for k in self.keys]
+        self.position = {k: i for i, k in enumerate(self.keys)}
+        self.bits = 0
+        self.rows = list(range(len(self.keys)))  # visible row -> key index
+        self.row_of = None  # key index -> visible row, None while unfiltered
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        i = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.labels[i]
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if self.bits >> i & 1 else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.UserRole:
+            return self.keys[i]
+        return None
+
+    def flags(self, index):
+        # Not user-checkable: the view toggles on a click anywhere in the row
+        return Qt.ItemFlag.ItemIsEnabled
+
+    def label(self, key):
+        return self.labels[self.position[key]]
+
+    def is_checked(self, key):
+        return bool(self.bits >> self.position[key] & 1)
+
+    def checked_keys(self):
+        return [k for i, k in enumerate(self.keys) if self.bits >> i & 1]
+
+    def set_checked(self, key, checked):
+        i = self.position[key]
+        if bool(self.bits >> i & 1) == checked:
+            return
+        self.bits ^= 1 << i
+        row = i if self.row_of is None else self.row_of.get(i)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        self.checked_changed.emit(key, checked)
+
+    def toggle(self, index):
+        if index.isValid():
+            key = self.keys[self.rows[index.row()]]
+            self.set_checked(key, not self.is_checked(key))
+
+    def clear_checks(self):
+        for key in self.checked_keys():
+            self.set_checked(key, False)
+
+    def set_filter(self, visible):
+        """Expose only the keys in ``visible``; None shows everything"""
+        self.beginResetModel()
+        if visible is None:
+            self.rows = list(range(len(self.keys)))
+            self.row_of = None
+        else:
+            self.rows = [i for i, k in enumerate(self.keys) if k in visible]
+            self.row_of = {i: r for r, i in enumerate(self.rows)}
+        self.endResetModel()
+
+
+class GridCellDelegate(QStyledItemDelegate):
+    """Sizes every item to the view's grid cell so labels use the full column"""
+
+    def sizeHint(self, option, index):
+        return self.parent().gridSize()
+
+
+class SymptomView(QListView):
+    """Wraps rows into ``columns`` equal-width columns, toggling on click"""
+
+    def __init__(self, columns=2, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.setObjectName("SymptomView")
+        self.setViewMode(QListView.ViewMode.ListMode)
+        self.setFlow(QListView.Flow.LeftToRight)
+        self.setWrapping(True)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.setItemDelegate(GridCellDelegate(self))
+        self.clicked.connect(self.on_clicked)
+
+    def setModel(self, model):
+        super().setModel(model)
+        self.update_grid()
+
+    def on_clicked(self, index):
+        self.model().toggle(index)
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Space and self.currentIndex().isValid():
+            self.model().toggle(self.currentIndex())
+        else:
+            super().keyPressEvent(event)
+
+    def update_grid(self):
+        height = self.fontMetrics().height() + 14
+        # One pixel short of an exact fit, or the last column wraps to the next row
+        self.setGridSize(QSize(max(1, (self.viewport().width() - 1) // self.columns), height))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_grid()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() in (QEvent.Type.FontChange, QEvent.Type.StyleChange):
+            self.update_grid()
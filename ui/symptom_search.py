@@ -0,0 +1,180 @@
+"""Prebuilt prefix / n-gram index for typo-tolerant symptom search"""
+import re
+from collections import OrderedDict
+
+# Quiet period after the last keystroke before the symptom grid is filtered
+SEARCH_DEBOUNCE_MS = 120
+# Distinct queries whose results are remembered, least recently used dropped first
+MEMO_SIZE = 256
+
+# Extra phrasings a user may type for a symptom key
+SYNONYMS = {
+    'itching': ['itchy', 'pruritus'],
+    'skin_rash': ['rashes'],
+    'continuous_sneezing': ['sneeze'],
+    'shivering': ['shaking', 'rigors'],
+    'stomach_pain': ['tummy ache', 'stomachache'],
+    'acidity': ['heartburn', 'acid reflux'],
+    'vomiting': ['throwing up', 'emesis', 'puking'],
+    'burning_micturition': ['burning urination', 'dysuria'],
+    'fatigue': ['tiredness', 'exhaustion'],
+    'breathlessness': ['shortness of breath', 'dyspnea', 'dyspnoea'],
+    'sweating': ['perspiration'],
+    'indigestion': ['dyspepsia'],
+    'headache': ['migraine', 'head pain'],
+    'yellowish_skin': ['jaundice'],
+    'nausea': ['queasy', 'sick to stomach'],
+    'loss_of_appetite': ['anorexia', 'not hungry'],
+    'abdominal_pain': ['belly ache', 'tummy pain'],
+    'diarrhoea': ['diarrhea', 'loose stools', 'loose motions'],
+    'high_fever': ['pyrexia', 'temperature'],
+    'mild_fever': ['low grade fever', 'temperature'],
+    'malaise': ['unwell'],
+    'phlegm': ['mucus'],
+    'runny_nose': ['rhinorrhea', 'rhinorrhoea'],
+    'congestion': ['blocked nose', 'stuffy nose'],
+    'fast_heart_rate': ['tachycardia', 'racing heart'],
+    'palpitations': ['pounding heart'],
+    'dizziness': ['lightheaded', 'vertigo'],
+    'spinning_movements': ['vertigo'],
+    'swelled_lymph_nodes': ['swollen glands'],
+    'enlarged_thyroid': ['goitre', 'goiter'],
+    'excessive_hunger': ['hyperphagia', 'polyphagia'],
+    'polyuria': ['frequent urination'],
+    'bruising': ['bruises'],
+    'blister': ['blisters'],
+    'cough': ['coughing'],
+    'depression': ['low mood'],
+    'irritability': ['irritable'],
+    'muscle_pain': ['myalgia'],
+    'joint_pain': ['arthralgia'],
+    'obesity': ['overweight'],
+    'constipation': ['hard stools'],
+    'bloody_stool': ['blood in stool'],
+    'chest_pain': ['angina'],
+}
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def display_name(key):
+    """How a symptom key is shown on its checkbox"""
+    return key.replace('_', ' ').title()
+
+
+def tokens(text):
+    return _WORD.findall(str(text).lower())
+
+
+def bigrams(token):
+    padded = f"^{token}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, or limit + 1 once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class SymptomIndex:
+    """Maps a search string to the symptom keys it matches.
+
+    Every query word has to match some word of the symptom's display name or
+    one of its synonyms, first as a prefix, then as a substring (found via a
+    trigram index), and only if neither hits, fuzzily within a small edit
+    distance (candidates from a bigram index), so "diarhea" finds
+    ``diarrhoea``. Words shorter than three letters only match as prefixes.
+    Results of the last ``MEMO_SIZE`` normalized queries are memoized.
+    """
+
+    def __init__(self, keys, synonyms=SYNONYMS):
+        self.keys = list(keys)
+        self.token_keys = {}  # word -> keys whose name or synonyms contain it
+        for key in self.keys:
+            phrases = [key] + list(synonyms.get(key, ()))
+            for word in {w for phrase in phrases for w in tokens(phrase)}:
+                self.token_keys.setdefault(word, set()).add(key)
+
+        self.prefixes = {}
+        self.trigrams = {}
+        self.bigrams = {}
+        for word in self.token_keys:
+            for n in range(1, len(word) + 1):
+                self.prefixes.setdefault(word[:n], set()).add(word)
+            for i in range(len(word) - 2):
+                self.trigrams.setdefault(word[i:i + 3], set()).add(word)
+            for gram in bigrams(word):
+                self.bigrams.setdefault(gram, set()).add(word)
+        self._memo = OrderedDict()
+        self.all_keys = frozenset(self.keys)
+
+    def words_for(self, word):
+        """Vocabulary words a single query word should match"""
+        hits = self.prefixes.get(word, set())
+        if len(word) >= 3:
+            grams = [self.trigrams.get(word[i:i + 3], set()) for i in range(len(word) - 2)]
+            hits = hits | {w for w in set.intersection(*grams) if word in w}
+            if not hits:
+                hits = self.fuzzy(word)
+        return hits
+
+    def fuzzy(self, word):
+        """Words within a few edits of ``word``, or of a prefix of its length"""
+        limit = 1 if len(word) <= 5 else 2
+        query_grams = bigrams(word)
+        shared = {}
+        for gram in query_grams:
+            for w in self.bigrams.get(gram, ()):
+                shared[w] = shared.get(w, 0) + 1
+        # A close match keeps most of the query's bigrams; a prefix match
+        # loses the end-of-word one as well
+        need = len(query_grams) - 2 * limit - 1
+        hits = set()
+        for w, n in shared.items():
+            if n < need:
+                continue
+            if any(edit_distance(word, w[:len(word) + d], limit) <= limit
+                   for d in range(-limit, limit + 1) if len(word) + d <= len(w)):
+                hits.add(w)
+        return hits
+
+    def search(self, query):
+        """Matching keys as a frozenset, or None when the query is empty (show all)"""
+        words = tokens(query)
+        if not words:
+            return None
+        cache_key = " ".join(words)
+        result = self._memo.get(cache_key)
+        if result is not None:
+            self._memo.move_to_end(cache_key)
+        else:
+            for word in words:
+                matched = set()
+                for w in self.words_for(word):
+                    matched |= self.token_keys[w]
+                result = matched if result is None else result & matched
+                if not result:
+                    break
+            result = frozenset(result)
+            self._memo[cache_key] = result
+            if len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return result
+
+    def visible(self, query):
+        """Keys to show for ``query``; every key when it is empty"""
+        result = self.search(query)
+        return self.all_keys if result is None else result
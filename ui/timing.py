@@ -0,0 +1,51 @@
+"""Lightweight wall-clock phase timing for startup and request paths"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """Records named phases and milestones relative to a start time.
+
+    Phases are durations (how long loading the model took); milestones are
+    offsets from ``start`` (when the first paint happened). Safe to use from
+    worker threads.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.phases = {}
+        self.milestones = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def milestone(self, name):
+        """Record the time elapsed since start under ``name`` (first call wins)"""
+        with self._lock:
+            self.milestones.setdefault(name, time.perf_counter() - self.start)
+        return self.milestones[name]
+
+    def report(self):
+        """One-line human readable summary in milliseconds"""
+        with self._lock:
+            marks = ", ".join(f"{k} {v * 1e3:.0f} ms" for k, v in self.milestones.items())
+            phases = ", ".join(f"{k} {v * 1e3:.0f} ms" for k, v in self.phases.items())
+        return f"{marks} ({phases})" if phases else marks
+
+    def metrics(self):
+        """Phases and milestones in seconds as labelled gauges for a metrics collector"""
+        with self._lock:
+            out = {f'startup_phase_seconds{{phase="{k}"}}': v for k, v in self.phases.items()}
+            out.update({f'startup_milestone_seconds{{milestone="{k}"}}': v for k, v in self.milestones.items()})
+        return out
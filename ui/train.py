@@ -0,0 +1,163 @@
+"""Train the gradient-boosting model that the apps load as model.pkl"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import platform
+import time
+
+import numpy as np
+
+from engine import DATA_PATH, MODEL_PATH, SYMPTOMS_DICT, DISEASES_LIST, SymptomEncoder
+from feature_store import BITS_FILE, FeatureStore
+from flat_model import export_model
+from knowledge import normalize
+
+SYMPTOM_COLUMNS = ['Symptom_1', 'Symptom_2', 'Symptom_3', 'Symptom_4']
+
+
+def load_training_data(data_path=DATA_PATH):
+    """Vectorize symtoms_df.csv into the symptoms_dict layout.
+
+    Returns a float32 N x 132 one-hot matrix and the integer labels used as
+    keys of DISEASES_LIST.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(data_path, "symtoms_df.csv"), usecols=['Disease'] + SYMPTOM_COLUMNS)
+    encoder = SymptomEncoder(SYMPTOMS_DICT)
+    label_of = {normalize(name): label for label, name in DISEASES_LIST.items()}
+
+    patients = []
+    for row in df[SYMPTOM_COLUMNS].itertuples(index=False):
+        symptoms = [str(c).strip() for c in row if isinstance(c, str) and c.strip()]
+        unknown = [s for s in symptoms if s not in encoder.index]
+        if unknown:
+            raise ValueError(f"Unknown symptoms in training data: {unknown}")
+        patients.append(symptoms)
+
+    try:
+        y = np.array([label_of[normalize(d)] for d in df['Disease']])
+    except KeyError as e:
+        raise ValueError(f"Disease {e} in training data is not in DISEASES_LIST") from None
+    return encoder.encode(patients), y
+
+
+def load_feature_store(path):
+    """Dense float32 X and labels y from a feature store built by feature_store.py.
+
+    The packed rows are memory-mapped and unpacked chunk by chunk straight
+    into X, so nothing larger than X itself is ever allocated.
+    """
+    store = FeatureStore(path)
+    if store.columns != list(SYMPTOMS_DICT):
+        raise ValueError(f"{path} columns do not match the symptom vocabulary")
+    if store.labels is None:
+        raise ValueError(f"{path} has no labels to train on")
+    return store.to_dense(), np.asarray(store.labels)
+
+
+def build_model(seed, n_estimators=100, learning_rate=0.1, max_depth=3):
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    return GradientBoostingClassifier(
+        n_estimators=n_estimators, learning_rate=learning_rate,
+        max_depth=max_depth, random_state=seed,
+    )
+
+
+def cross_validate_model(model, X, y, folds, n_jobs, seed):
+    """Stratified k-fold accuracy, one fold per joblib worker"""
+    from sklearn.model_selection import StratifiedKFold, cross_validate
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    scores = cross_validate(model, X, y, cv=cv, n_jobs=n_jobs, scoring='accuracy')
+    return [float(s) for s in scores['test_score']]
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_artifacts(model, metadata, output):
+    """Atomically write model.pkl and its model.json sidecar"""
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, output)
+    with open(os.path.splitext(output)[0] + ".json", 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train model.pkl from data/symtoms_df.csv")
+    parser.add_argument('--data', default=DATA_PATH, help="directory holding symtoms_df.csv")
+    parser.add_argument('--features', help="train from a feature store directory instead of the CSV")
+    parser.add_argument('--output', default=MODEL_PATH, help="model file to write")
+    parser.add_argument('--folds', type=int, default=5, help="cross-validation folds (0 to skip)")
+    parser.add_argument('--jobs', type=int, default=-1, help="parallel CV workers, -1 for all cores")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--learning-rate', type=float, default=0.1)
+    parser.add_argument('--max-depth', type=int, default=3)
+    parser.add_argument('--no-export', action='store_true', help="skip writing the flat model.npz")
+    args = parser.parse_args()
+
+    import pandas as pd
+    import sklearn
+
+    t0 = time.perf_counter()
+    if args.features:
+        X, y = load_feature_store(args.features)
+        data_file = os.path.join(args.features, BITS_FILE)
+    else:
+        X, y = load_training_data(args.data)
+        data_file = os.path.join(args.data, "symtoms_df.csv")
+    model = build_model(args.seed, args.n_estimators, args.learning_rate, args.max_depth)
+    print(f"Loaded {X.shape[0]} records, {X.shape[1]} symptoms, {len(np.unique(y))} diseases")
+
+    cv_scores = []
+    if args.folds > 1:
+        t = time.perf_counter()
+        cv_scores = cross_validate_model(model, X, y, args.folds, args.jobs, args.seed)
+        print(f"{args.folds}-fold accuracy {np.mean(cv_scores):.4f} +/- {np.std(cv_scores):.4f} "
+              f"({time.perf_counter() - t:.1f}s)")
+
+    t = time.perf_counter()
+    # Fit on named columns so the apps can validate feature_names_in_ at load time
+    model.fit(pd.DataFrame(X, columns=list(SYMPTOMS_DICT)), y)
+    fit_seconds = time.perf_counter() - t
+
+    metadata = {
+        'model': type(model).__name__,
+        'params': {k: v for k, v in model.get_params().items() if isinstance(v, (int, float, str, bool, type(None)))},
+        'seed': args.seed,
+        'n_samples': int(X.shape[0]),
+        'n_features': int(X.shape[1]),
+        'classes': [int(c) for c in model.classes_],
+        'cv_folds': args.folds,
+        'cv_accuracy': cv_scores,
+        'train_accuracy': float(model.score(pd.DataFrame(X, columns=list(SYMPTOMS_DICT)), y)),
+        'fit_seconds': round(fit_seconds, 3),
+        'total_seconds': round(time.perf_counter() - t0, 3),
+        'data_sha1': file_sha1(data_file),
+        'sklearn_version': sklearn.__version__,
+        'numpy_version': np.__version__,
+        'python_version': platform.python_version(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+    write_artifacts(model, metadata, args.output)
+    print(f"Wrote {args.output} (fit {fit_seconds:.1f}s, train accuracy {metadata['train_accuracy']:.4f})")
+    if not args.no_export:
+        flat_path = os.path.splitext(args.output)[0] + ".npz"
+        export_model(model, flat_path, args.output)
+        print(f"Wrote {flat_path}")
+
+
+if __name__ == '__main__':
+    main()